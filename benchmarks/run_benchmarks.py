@@ -0,0 +1,284 @@
+"""
+Benchmarks for transition dispatch, events, queues and memory use.
+
+Run from the repository root, results are written as JSON:
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json
+
+With ``--compare`` the new results are printed next to those of an earlier run.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import tracemalloc
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from ministate import Event, State, StateMachine  # noqa: E402
+from ministate.definition import MachineDefinition  # noqa: E402
+
+EVENTS = 10_000
+
+
+class TableState(State):
+    """Looks up the next state by name, like the states in the examples."""
+
+    def process(self, event: Event):
+        return self.model.transitions[self.name][event.name]
+
+
+class Ping(TableState):
+    pass
+
+
+class Pong(TableState):
+    pass
+
+
+def make_machine(compiled: bool = False) -> StateMachine:
+    machine = StateMachine(states=[Ping(), Pong()], compiled=compiled)
+    machine.transitions = {"Ping": {"hit": machine.Pong}, "Pong": {"hit": machine.Ping}}
+    machine.current_state = machine.Ping
+    return machine
+
+
+def bench(statement, number: int = EVENTS, repeat: int = 5) -> float:
+    """Returns the best time per call in nanoseconds."""
+    timer = timeit.Timer(statement)
+    return min(timer.repeat(repeat=repeat, number=1)) / number * 1e9
+
+
+def bench_process(compiled: bool, metrics: bool = False) -> float:
+    machine = make_machine(compiled)
+    if metrics:
+        machine.enable_metrics()
+    events = [Event("hit")] * EVENTS
+    process = machine.process
+
+    def run():
+        for event in events:
+            process(event)
+
+    return bench(run)
+
+
+def bench_metrics_overhead(rounds: int = 500, number: int = 2_000) -> float:
+    """Time metrics add per event on a compiled machine. Plain and metered runs alternate and
+    the best of each is compared, so a noisy host affects both alike."""
+    metered = make_machine(compiled=True)
+    metered.enable_metrics()
+    events = [Event("hit")] * number
+
+    def timer(process) -> timeit.Timer:
+        def run():
+            for event in events:
+                process(event)
+
+        return timeit.Timer(run)
+
+    timers = [timer(make_machine(compiled=True).process), timer(metered.process)]
+    best = [float("inf")] * len(timers)
+    for _ in range(rounds):
+        for i, each in enumerate(timers):
+            best[i] = min(best[i], each.timeit(1))
+    return (best[1] - best[0]) / number * 1e9
+
+
+def bench_definition(specialized: bool) -> float:
+    """Machine of a shared definition, with the generic or the generated process function."""
+    ping, pong = Ping(), Pong()
+    definition = MachineDefinition([ping, pong], {"Ping": {"hit": pong}, "Pong": {"hit": ping}})
+    if specialized:
+        definition.specialize()
+    machine = definition.create(state=ping)
+    events = [Event("hit")] * EVENTS
+    process = machine.process
+
+    def run():
+        for event in events:
+            process(event)
+
+    return bench(run)
+
+
+def bench_construction(lazy: bool, count: int = 1_000) -> float:
+    """Creates machines with 30 states, each state an object of its own class."""
+    classes = [type(f"Step{i}", (State,), {}) for i in range(30)]
+    if lazy:
+        definition = MachineDefinition(classes, {})
+
+        def run():
+            for _ in range(count):
+                definition.create(state="Step0")
+
+    else:
+
+        def run():
+            for _ in range(count):
+                StateMachine(states=[cls() for cls in classes])
+
+    return bench(run, number=count)
+
+
+def bench_event_construction() -> float:
+    def run():
+        for i in range(EVENTS):
+            Event("hit", i)
+
+    return bench(run)
+
+
+def bench_event_singleton() -> float:
+    def run():
+        for _ in range(EVENTS):
+            Event("hit")
+
+    return bench(run)
+
+
+def bench_event_hash() -> float:
+    event = Event("hit", 1)
+
+    def run():
+        for _ in range(EVENTS):
+            hash(event)
+
+    return bench(run)
+
+
+def bench_table_lookup(keyed_by_event: bool) -> float:
+    """Nested transitions lookup keyed by Event objects or by event names."""
+    event = Event("more", 1)
+    key = event if keyed_by_event else "more"
+    transitions = {"Adding": {key: "Subtracting"}}
+
+    if keyed_by_event:
+
+        def run():
+            for _ in range(EVENTS):
+                transitions["Adding"][event]
+
+    else:
+
+        def run():
+            for _ in range(EVENTS):
+                transitions["Adding"][event.name]
+
+    return bench(run)
+
+
+def bench_queue(builtin: bool) -> float:
+    """Queues all events and drains them, built-in queue or a hand-written deque loop."""
+    events = [Event("hit")] * EVENTS
+    machine = make_machine(compiled=True)
+
+    if builtin:
+
+        def run():
+            machine.dispatch_many(events)
+            machine.run_until_idle()
+
+    else:
+
+        def run():
+            queue = deque(events)
+            while True:
+                try:
+                    event = queue.popleft()
+                except IndexError:
+                    break
+                machine.process(event)
+
+    return bench(run)
+
+
+def memory_per_machine(count: int = 10_000, shared: bool = False) -> float:
+    """Returns the bytes allocated per machine with two states."""
+    if shared:
+        ping, pong = Ping(), Pong()
+        definition = MachineDefinition([ping, pong], {"Ping": {"hit": pong}, "Pong": {"hit": ping}})
+
+        def factory():
+            return definition.create(state=ping)
+
+    else:
+        factory = make_machine
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    machines = [factory() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del machines
+    return (after - before) / count
+
+
+BENCHMARKS = {
+    "process_ns": lambda: bench_process(compiled=False),
+    "process_compiled_ns": lambda: bench_process(compiled=True),
+    "process_metrics_ns": lambda: bench_process(compiled=True, metrics=True),
+    "metrics_overhead_ns": bench_metrics_overhead,
+    "process_definition_ns": lambda: bench_definition(specialized=False),
+    "process_specialized_ns": lambda: bench_definition(specialized=True),
+    "construction_ns": lambda: bench_construction(lazy=False),
+    "construction_lazy_ns": lambda: bench_construction(lazy=True),
+    "event_construction_ns": bench_event_construction,
+    "event_singleton_ns": bench_event_singleton,
+    "event_hash_ns": bench_event_hash,
+    "table_event_keyed_ns": lambda: bench_table_lookup(keyed_by_event=True),
+    "table_name_keyed_ns": lambda: bench_table_lookup(keyed_by_event=False),
+    "queue_builtin_ns": lambda: bench_queue(builtin=True),
+    "queue_deque_loop_ns": lambda: bench_queue(builtin=False),
+    "machine_bytes": memory_per_machine,
+    "machine_shared_definition_bytes": lambda: memory_per_machine(shared=True),
+}
+
+
+def run(selected=None) -> dict:
+    results = {}
+    for name, benchmark in BENCHMARKS.items():
+        if selected and name not in selected:
+            continue
+        results[name] = round(benchmark(), 1)
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare with")
+    parser.add_argument("benchmarks", nargs="*", help="run only these benchmarks")
+    args = parser.parse_args(argv)
+
+    report = run(args.benchmarks)
+    previous = {}
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)["results"]
+
+    for name, value in report["results"].items():
+        line = f"{name:<32}{value:>12.1f}"
+        if name in previous and previous[name]:
+            line += f"{previous[name]:>12.1f}{value / previous[name]:>8.2f}x"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,2 @@
 from .statemachine import State, StateMachine, Event
+from .table import Transition
@@ -0,0 +1,115 @@
+"""Actor-style access to a state machine from many threads."""
+
+import threading
+from collections import deque
+from concurrent.futures import Executor
+from typing import Optional
+
+from .statemachine import Event, StateMachine
+
+
+class Mailbox:
+    """Event mailbox for many producer threads and a single consumer.
+
+    ``deque.append`` and ``deque.popleft`` are atomic, so neither side takes a lock. The
+    consumer can sleep in ``wait`` until a producer signals new events."""
+
+    def __init__(self):
+        self._events = deque()
+        self._ready = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def put(self, event: Event):
+        """Adds an event, safe to call from any thread."""
+        self._events.append(event)
+        self._ready.set()
+
+    def pop(self) -> Optional[Event]:
+        """Removes and returns the oldest event, or None if the mailbox is empty."""
+        try:
+            return self._events.popleft()
+        except IndexError:
+            return None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until events were put since the last wait, returns False on timeout."""
+        ready = self._ready.wait(timeout)
+        # events put after clearing set the flag again, events put before are drained next
+        self._ready.clear()
+        return ready
+
+    def wake(self):
+        """Wakes up a waiting consumer without adding an event."""
+        self._ready.set()
+
+
+class MachineActor:
+    """Applies events sent from any thread to a machine in the order they arrived.
+
+    Producers only append to the mailbox. The events are applied either by a dedicated
+    consumer thread (``start``/``stop``) or, if an ``executor`` is given, by a task on that
+    shared pool. A non-blocking token makes sure at most one task drains the mailbox, so many
+    actors can share a few worker threads without a global lock."""
+
+    def __init__(self, machine: StateMachine, executor: Optional[Executor] = None):
+        self.machine = machine
+        self.mailbox = Mailbox()
+        self._executor = executor
+        self._token = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def send(self, event: Event):
+        """Sends an event to the machine, safe to call from any thread."""
+        self.mailbox.put(event)
+        if self._executor is not None and self._token.acquire(blocking=False):
+            self._executor.submit(self._drain)
+
+    def run_pending(self) -> int:
+        """Applies all waiting events in the calling thread, which must be the only consumer.
+        Returns the number of applied events."""
+        pop = self.mailbox.pop
+        process = self.machine.process
+        count = 0
+        event = pop()
+        while event is not None:
+            process(event)
+            count += 1
+            event = pop()
+        return count
+
+    def _drain(self):
+        """Pool task, runs while holding the token."""
+        while True:
+            try:
+                self.run_pending()
+            finally:
+                self._token.release()
+            # an event sent after draining could not take the token, so check again
+            if not self.mailbox or not self._token.acquire(blocking=False):
+                return
+
+    def start(self):
+        """Starts a dedicated consumer thread."""
+        if self._executor is not None:
+            raise RuntimeError("Actor is already served by an executor.")
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while self._running:
+            self.mailbox.wait()
+            self.run_pending()
+        # events sent before stop while the last run_pending was busy
+        self.run_pending()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stops the consumer thread after it applied the events waiting so far."""
+        self._running = False
+        self.mailbox.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
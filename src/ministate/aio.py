@@ -0,0 +1,149 @@
+"""A state machine driven by an asyncio event queue."""
+
+import asyncio
+import inspect
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+from .statemachine import Event, State, StateMachine
+
+Events = Union[Iterable[Event], AsyncIterator[Event]]
+
+
+class AsyncStateMachine(StateMachine):
+    """A state machine that receives its events through a bounded asyncio queue.
+
+    ``State.process`` may be a coroutine function, its result is awaited before the machine
+    switches state. ``dispatch`` waits while the queue is full, which slows producers down to
+    the pace of the machine. ``run`` drains the queue and gives control back to the event loop
+    every ``yield_every`` events, so many machines can share one loop.
+
+    All methods that process events are coroutines (``dispatch_many``, ``run_until_idle``,
+    ``run_stream``) or async generators (``feed``). Hooks, metrics and memoization wrap the
+    synchronous ``process`` and raise TypeError."""
+
+    def __init__(
+        self,
+        model: Optional[object] = None,
+        states: Optional[List[State]] = None,
+        transitions: Optional[Dict] = None,
+        current_state: Optional[State] = None,
+        compiled: bool = False,
+        maxsize: int = 1024,
+        yield_every: int = 64,
+    ):
+        super().__init__(model, states, transitions, current_state, compiled)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.yield_every = yield_every
+
+    async def dispatch(self, event: Event):
+        """Puts the event into the queue, waiting for a free slot if the queue is full."""
+        await self.queue.put(event)
+
+    def dispatch_nowait(self, event: Event):
+        """Puts the event into the queue, raises asyncio.QueueFull if there is no free slot."""
+        self.queue.put_nowait(event)
+
+    async def dispatch_many(self, events: Iterable[Event]) -> int:
+        """Puts several events into the queue, waiting for free slots. Returns their number."""
+        count = 0
+        for count, event in enumerate(events, 1):
+            await self.queue.put(event)
+        return count
+
+    def add_hook(self, kind: str, callback):
+        """Unsupported, the hook wrapper would not await the coroutine process."""
+        raise TypeError("Hooks are not supported by AsyncStateMachine.")
+
+    def enable_metrics(self, metrics=None):
+        """Unsupported, the metered process would not await the coroutine process."""
+        raise TypeError("Metrics are not supported by AsyncStateMachine.")
+
+    def enable_memo(self, memo=None):
+        """Unsupported, the memo would cache coroutines instead of next states."""
+        raise TypeError("Memoization is not supported by AsyncStateMachine.")
+
+    async def process(self, event: Event):
+        """Processes the given event and switches to next state."""
+        if self.current_state is None:
+            return
+        if self.compiled:
+            next_state = self._lookup(event)
+            if next_state is not None:
+                self.current_state = next_state
+                return
+        next_state = self.current_state.process(event)
+        if inspect.isawaitable(next_state):
+            next_state = await next_state
+        self.current_state = next_state
+
+    async def run(self):
+        """Processes queued events until the task is cancelled."""
+        queue = self.queue
+        processed = 0
+        while True:
+            event = await queue.get()
+            try:
+                await self.process(event)
+            finally:
+                queue.task_done()
+            processed += 1
+            if processed % self.yield_every == 0:
+                # queue.get() does not suspend while events are waiting
+                await asyncio.sleep(0)
+
+    async def run_until_idle(self) -> int:
+        """Processes queued events, including those queued meanwhile, until the queue is empty.
+        Returns the number of processed events."""
+        queue = self.queue
+        count = 0
+        while not queue.empty():
+            event = queue.get_nowait()
+            try:
+                await self.process(event)
+            finally:
+                queue.task_done()
+            count += 1
+        return count
+
+    async def feed(
+        self, events: Events, chunk_size: int = 256, skip_self: bool = False
+    ) -> AsyncIterator[Tuple[Optional[State], Event, Optional[State]]]:
+        """Processes events from an iterable or async iterable and yields a (source, event,
+        target) transition per event, see ``StateMachine.feed``."""
+        transitions = []
+        taken = 0
+        async for event in _iterate(events):
+            source = self.current_state
+            await self.process(event)
+            target = self.current_state
+            if target is not source or not skip_self:
+                transitions.append((source, event, target))
+            taken += 1
+            if taken == chunk_size:
+                for transition in transitions:
+                    yield transition
+                transitions.clear()
+                taken = 0
+        for transition in transitions:
+            yield transition
+
+    async def run_stream(self, events: Events) -> int:
+        """Processes all events from an iterable or async iterable, returns their number."""
+        count = 0
+        async for event in _iterate(events):
+            await self.process(event)
+            count += 1
+        return count
+
+    async def join(self):
+        """Waits until every queued event has been processed."""
+        await self.queue.join()
+
+
+async def _iterate(events: Events) -> AsyncIterator[Event]:
+    if hasattr(events, "__aiter__"):
+        async for event in events:
+            yield event
+    else:
+        for event in events:
+            yield event
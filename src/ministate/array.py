@@ -0,0 +1,134 @@
+"""Many identical state machines advanced together with NumPy. Requires ``numpy``."""
+
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .definition import NO_STATE
+from .statemachine import Event, State
+from .table import GUARDED, NO_TRANSITION, TransitionTable
+
+
+class MachineArray:
+    """An array of machines that share their states and transitions table.
+
+    The current state of every instance is kept in the integer array ``state_ids``. A batch of
+    (instance id, event id) pairs is advanced with one table lookup for all rows. Only rows
+    without a table entry call ``State.process`` of the shared state objects; during each such
+    call the state's model is the instance's model from ``models``, or ``model``. Guards and
+    actions of the table are evaluated for those rows as well, with the same model. Instances
+    whose state returned None hold ``NO_STATE`` and ignore further events."""
+
+    def __init__(
+        self,
+        size: int,
+        states: List[State],
+        transitions: Dict,
+        initial_state: State,
+        model: Optional[object] = None,
+        models: Optional[Sequence[object]] = None,
+        events: Iterable = (),
+    ):
+        self.table = TransitionTable(states, transitions, events)
+        self.model = model
+        self.models = models
+        self._rows = np.array(self.table.rows, dtype=np.int32).reshape(
+            len(self.table.states), self.table.columns
+        )
+        self.state_ids = np.full(size, self.table.state_index[initial_state], dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.state_ids)
+
+    @property
+    def states(self) -> List[State]:
+        """Returns all possible states."""
+        return self.table.states
+
+    def event_id(self, event) -> int:
+        """Returns the column of the given event or event name."""
+        event_id = Event.intern(event) if isinstance(event, str) else event.id
+        if event_id >= self.table.columns:
+            raise KeyError(f"Event {event} has no column in this array, pass it as one of the events.")
+        return event_id
+
+    def current_state(self, instance: int) -> Optional[State]:
+        """Returns the current state of a single instance."""
+        state_id = self.state_ids[instance]
+        return None if state_id == NO_STATE else self.table.states[state_id]
+
+    def process(self, instance_ids, event_ids, cargo: Optional[Sequence] = None):
+        """Processes a batch of events, row i sends event_ids[i] to instance_ids[i].
+
+        Events for the same instance are applied in batch order. The optional ``cargo`` is
+        aligned with the batch and only used for rows handed to ``State.process``."""
+        instance_ids = np.asarray(instance_ids, dtype=np.intp)
+        event_ids = np.asarray(event_ids, dtype=np.intp)
+        if instance_ids.size == 0:
+            return
+
+        # rows of instances that occur once are applied in one vectorized step, the rows of
+        # each repeated instance in one pass in batch order
+        order = np.argsort(instance_ids, kind="stable")
+        _, starts, counts = np.unique(instance_ids[order], return_index=True, return_counts=True)
+        if len(starts) == len(order):
+            self._step(instance_ids, event_ids, np.arange(len(order)), cargo)
+            return
+        single = order[starts[counts == 1]]
+        if len(single):
+            self._step(instance_ids[single], event_ids[single], single, cargo)
+        for start, count in zip(starts[counts > 1].tolist(), counts[counts > 1].tolist()):
+            rows = order[start : start + count]
+            self._run(int(instance_ids[rows[0]]), event_ids[rows].tolist(), rows.tolist(), cargo)
+
+    def _step(self, instance_ids, event_ids, rows, cargo: Optional[Sequence]):
+        """Advances distinct instances by one event each."""
+        current = self.state_ids[instance_ids]
+        next_ids = self._rows[current, event_ids]
+        # stopped instances would index the last row
+        next_ids[current == NO_STATE] = NO_STATE
+
+        for i in np.nonzero(next_ids < 0)[0].tolist():
+            next_ids[i] = self._fallback(
+                int(instance_ids[i]),
+                int(current[i]),
+                int(event_ids[i]),
+                int(next_ids[i]),
+                int(rows[i]),
+                cargo,
+            )
+
+        self.state_ids[instance_ids] = next_ids
+
+    def _run(self, instance: int, event_ids: List[int], rows: List[int], cargo: Optional[Sequence]):
+        """Advances one instance by several events, in order."""
+        table_rows = self.table.rows
+        state_id = int(self.state_ids[instance])
+        for event_id, row in zip(event_ids, rows):
+            next_id = NO_STATE if state_id == NO_STATE else table_rows[state_id][event_id]
+            if next_id < 0:
+                next_id = self._fallback(instance, state_id, event_id, next_id, row, cargo)
+            state_id = next_id
+        self.state_ids[instance] = state_id
+
+    def _fallback(
+        self, instance: int, state_id: int, event_id: int, next_id: int, row: int, cargo: Optional[Sequence]
+    ) -> int:
+        """Resolves a guarded entry or hands the event to State.process, returns the next id."""
+        if state_id == NO_STATE:
+            return NO_STATE
+        model = self.model if self.models is None else self.models[instance]
+        event = Event(Event.name_of(event_id), None if cargo is None else cargo[row])
+        if next_id == GUARDED:
+            next_id = self.table.take(state_id, event, model)
+        if next_id != NO_TRANSITION:
+            return next_id
+        state = self.table.states[state_id]
+        # the state objects are shared, lend them the instance's model for this call only
+        previous = state.model
+        state.model = model
+        try:
+            next_state = state.process(event)
+        finally:
+            state.model = previous
+        return NO_STATE if next_state is None else self.table.state_index[next_state]
@@ -0,0 +1,119 @@
+"""Generating specialized process functions for compiled transition tables."""
+
+import hashlib
+import marshal
+import os
+import sys
+from types import CodeType
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .definition import Machine
+from .event import Event
+from .table import GUARDED, NO_TRANSITION, TransitionTable
+
+# branches with more cases than this are split in halves
+_LINEAR_CASES = 4
+
+
+def _branch(variable: str, cases: List[Tuple[int, List[str]]], indent: str) -> List[str]:
+    """Emits code running the body of the case equal to variable, as a binary search over
+    comparisons. Falls through if there is no matching case."""
+    if len(cases) <= _LINEAR_CASES:
+        lines = []
+        for i, (value, body) in enumerate(cases):
+            lines.append(f"{indent}{'elif' if i else 'if'} {variable} == {value}:")
+            lines.extend(indent + "    " + line for line in body)
+        return lines
+    middle = len(cases) // 2
+    return (
+        [f"{indent}if {variable} < {cases[middle][0]}:"]
+        + _branch(variable, cases[:middle], indent + "    ")
+        + [f"{indent}else:"]
+        + _branch(variable, cases[middle:], indent + "    ")
+    )
+
+
+def generate_source(table: TransitionTable) -> str:
+    """Returns the source of ``process(machine, event)`` with the entries of the table inlined
+    as integer comparisons on the state id and event id. Guarded entries call ``take``, events
+    without an entry call ``machine._fallback``."""
+    state_cases = []
+    for state_id, row in enumerate(table.rows):
+        event_cases = []
+        for event_id, target in enumerate(row):
+            if target == GUARDED:
+                body = [
+                    f"next_id = take({state_id}, event, machine.model)",
+                    f"if next_id != {NO_TRANSITION}:",
+                    "    machine.state_id = next_id",
+                    "    return",
+                ]
+            elif target != NO_TRANSITION:
+                body = [f"machine.state_id = {target}", "return"]
+            else:
+                continue
+            event_cases.append((event_id, body))
+        if event_cases:
+            state_cases.append((state_id, _branch("event_id", event_cases, "")))
+
+    lines = [
+        "def process(machine, event):",
+        "    state_id = machine.state_id",
+        "    event_id = event.id",
+    ]
+    lines.extend(_branch("state_id", state_cases, "    "))
+    lines.append("    machine._fallback(state_id, event)")
+    return "\n".join(lines) + "\n"
+
+
+def cache_key(table: TransitionTable) -> str:
+    """Identifies the generated code of a table: its entries, the event names the ids stand for
+    and the Python version the code object was compiled with."""
+    digest = hashlib.sha256(sys.version.encode())
+    digest.update(repr(table.rows).encode())
+    digest.update(repr([Event.name_of(i) for i in range(table.columns)]).encode())
+    return digest.hexdigest()
+
+
+def _compile(table: TransitionTable, cache_dir: Optional[str]) -> CodeType:
+    if cache_dir is None:
+        return compile(generate_source(table), "<ministate.codegen>", "exec")
+    key = cache_key(table)
+    code_path = os.path.join(cache_dir, key + ".code")
+    try:
+        with open(code_path, "rb") as file:
+            return marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    source = generate_source(table)
+    source_path = os.path.join(cache_dir, key + ".py")
+    code = compile(source, source_path, "exec")
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(source_path, "w") as file:
+        file.write(source)
+    temporary = code_path + f".{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        marshal.dump(code, file)
+    os.replace(temporary, code_path)
+    return code
+
+
+def compile_process(table: TransitionTable, cache_dir: Optional[str] = None) -> Callable:
+    """Returns a specialized ``process(machine, event)`` for ``Machine`` instances of the table.
+    It behaves like ``Machine.process``, but finds table entries by inlined comparisons instead
+    of indexing the rows.
+
+    With ``cache_dir``, the generated source and the marshalled code object are stored there,
+    keyed by ``cache_key``, and loaded instead of generated the next time."""
+    namespace: Dict[str, object] = {"take": table.take}
+    exec(_compile(table, cache_dir), namespace)
+    return namespace["process"]
+
+
+def specialize(table: TransitionTable, cache_dir: Optional[str] = None, base: type = Machine) -> type:
+    """Returns a subclass of base (Machine or LazyMachine) using the specialized process
+    function of the table."""
+    return type(
+        "SpecializedMachine", (base,), {"__slots__": (), "process": compile_process(table, cache_dir)}
+    )
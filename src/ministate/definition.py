@@ -0,0 +1,176 @@
+"""Machine definitions shared by many lightweight machine instances."""
+
+from typing import Dict, Iterable, List, Optional, Type, Union
+
+from .event import Event
+from .statemachine import State
+from .table import GUARDED, NO_TRANSITION, TransitionTable
+
+# state id of a machine without a current state
+NO_STATE = -1
+
+
+def _placeholder(state_class: Type[State]) -> State:
+    """Creates a state object for the table without running the __init__ of the subclass."""
+    state = state_class.__new__(state_class)
+    State.__init__(state)
+    return state
+
+
+class MachineDefinition:
+    """States and transitions, compiled once and shared by all machines created from it.
+
+    States given as objects are shared as well: before ``State.process`` runs for a machine,
+    the state's model is set to the model of that machine. States given as State subclasses
+    are instantiated per machine, only when a machine first uses them (see ``LazyMachine``)."""
+
+    def __init__(self, states: List[Union[State, Type[State]]], transitions: Dict, events: Iterable = ()):
+        self.factories: List[Optional[Type[State]]] = [
+            state if isinstance(state, type) else None for state in states
+        ]
+        self.table = TransitionTable(
+            [
+                state if factory is None else _placeholder(factory)
+                for state, factory in zip(states, self.factories)
+            ],
+            transitions,
+            events,
+        )
+        self.machine_class = LazyMachine if any(self.factories) else Machine
+
+    @property
+    def states(self) -> List[State]:
+        """Returns all possible states."""
+        return self.table.states
+
+    @property
+    def graph(self) -> TransitionTable:
+        """The compiled transitions table, for reachability and path queries."""
+        return self.table
+
+    def state_id(self, state: Union[State, str, None]) -> int:
+        """Returns the id of a state given as State or name, NO_STATE for None."""
+        if state is None:
+            return NO_STATE
+        return self.table.state_ids[state if isinstance(state, str) else state.name]
+
+    def create(self, model: Optional[object] = None, state: Union[State, str, None] = None) -> "Machine":
+        """Creates a machine in the given state."""
+        return self.machine_class(self, model, self.state_id(state))
+
+    def specialize(self, cache_dir: Optional[str] = None):
+        """Makes ``create`` return machines with a process function generated for this table,
+        see ``codegen.compile_process``. The generated code is cached in ``cache_dir``."""
+        from .codegen import specialize
+
+        self.machine_class = specialize(self.table, cache_dir, self.machine_class)
+
+
+class Machine:
+    """A machine that only holds its definition, its model and the id of its current state.
+
+    Behaves like a compiled StateMachine: events with a table entry switch the state directly,
+    other events are handed to ``State.process`` of the current state, which may return a state
+    object, a state name or None to stop the machine."""
+
+    __slots__ = ("definition", "model", "state_id")
+
+    def __init__(
+        self, definition: MachineDefinition, model: Optional[object] = None, state_id: int = NO_STATE
+    ):
+        self.definition = definition
+        # default to self if no model is given
+        self.model = model if model is not None else self
+        self.state_id = state_id
+
+    @property
+    def states(self) -> List[State]:
+        """Returns all possible states."""
+        return self.definition.table.states
+
+    @property
+    def current_state(self) -> Optional[State]:
+        """The current state object, shared with the other machines of the definition."""
+        return None if self.state_id == NO_STATE else self.definition.table.states[self.state_id]
+
+    @current_state.setter
+    def current_state(self, state: Union[State, str, None]) -> None:
+        self.state_id = self.definition.state_id(state)
+
+    def process(self, event: Event):
+        """Processes the given event and switches to next state."""
+        state_id = self.state_id
+        if state_id == NO_STATE:
+            return
+        table = self.definition.table
+        try:
+            next_id = table.rows[state_id][event.id]
+        except IndexError:
+            next_id = NO_TRANSITION
+        if next_id == GUARDED:
+            next_id = table.take(state_id, event, self.model)
+        if next_id == NO_TRANSITION:
+            self._fallback(state_id, event)
+        else:
+            self.state_id = next_id
+
+    def _fallback(self, state_id: int, event: Event):
+        """Hands an event without table entry to the current state."""
+        if state_id == NO_STATE:
+            return
+        table = self.definition.table
+        state = table.states[state_id]
+        state.model = self.model
+        self.state_id = self.definition.state_id(state.process(event))
+
+
+class LazyMachine(Machine):
+    """A machine that creates its own objects for states given as classes, on first use.
+
+    A state is used when an event is handed to its ``process`` or when it is accessed as
+    ``current_state`` or as attribute named like the state, e.g. ``machine.Idle``. Table
+    entries switch states without creating them. ``process`` may return a state object of
+    any machine of the definition, or a state name."""
+
+    __slots__ = ("_states",)
+
+    def __init__(
+        self, definition: MachineDefinition, model: Optional[object] = None, state_id: int = NO_STATE
+    ):
+        super().__init__(definition, model, state_id)
+        self._states: Dict[int, State] = {}
+
+    def state(self, state_id: int) -> State:
+        """Returns the object of a state for this machine, creating it if needed."""
+        state = self._states.get(state_id)
+        if state is None:
+            factory = self.definition.factories[state_id]
+            if factory is None:
+                return self.definition.table.states[state_id]
+            state = self._states[state_id] = factory()
+            state.model = self.model
+        return state
+
+    @property
+    def current_state(self) -> Optional[State]:
+        """The current state object."""
+        return None if self.state_id == NO_STATE else self.state(self.state_id)
+
+    @current_state.setter
+    def current_state(self, state: Union[State, str, None]) -> None:
+        self.state_id = self.definition.state_id(state)
+
+    def __getattr__(self, name: str) -> State:
+        try:
+            state_id = self.definition.table.state_ids[name]
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}") from None
+        return self.state(state_id)
+
+    def _fallback(self, state_id: int, event: Event):
+        if state_id == NO_STATE:
+            return
+        state = self.state(state_id)
+        # shared states serve several machines
+        state.model = self.model
+        self.state_id = self.definition.state_id(state.process(event))
@@ -0,0 +1,189 @@
+"""Durable state machines backed by a write-ahead log and snapshots on local files."""
+
+import os
+import pickle
+import struct
+import zlib
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .snapshot import dump_state, load_state
+from .statemachine import Event, StateMachine
+
+# crc32, sequence number, name length, cargo length
+_RECORD = struct.Struct("<IQHI")
+# magic, sequence number of the last event included in the snapshot
+_SNAPSHOT = struct.Struct("<4sQ")
+_MAGIC = b"MSSN"
+
+LOG_FILE = "events.wal"
+SNAPSHOT_FILE = "state.snapshot"
+
+
+def _encode(sequence: int, event: Event) -> bytes:
+    name = event.name.encode()
+    cargo = b"" if event.cargo is None else pickle.dumps(event.cargo)
+    body = _RECORD.pack(0, sequence, len(name), len(cargo))[4:] + name + cargo
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def _decode(data: bytes) -> Iterator[Tuple[int, int, Event]]:
+    """Yields (end offset, sequence, event) per record, stops at a torn or corrupt record."""
+    offset = 0
+    while offset + _RECORD.size <= len(data):
+        crc, sequence, name_length, cargo_length = _RECORD.unpack_from(data, offset)
+        end = offset + _RECORD.size + name_length + cargo_length
+        if end > len(data) or zlib.crc32(data[offset + 4 : end]) != crc:
+            return
+        name_end = offset + _RECORD.size + name_length
+        name = data[offset + _RECORD.size : name_end].decode()
+        cargo = pickle.loads(data[name_end:end]) if cargo_length else None
+        yield end, sequence, Event(name, cargo)
+        offset = end
+
+
+def _fsync_directory(directory: str):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class DurableMachine:
+    """Persists every event applied to a machine, so its state survives a crash.
+
+    Events are appended to a write-ahead log in ``directory`` once ``machine.process`` accepted
+    them, an event that raises is not logged. Records are buffered and written with one fsync
+    per ``group_size`` events or on ``commit``; a crash loses at most the uncommitted events.
+    On construction the machine is restored from the snapshot and the events logged after it
+    are replayed through ``machine.process``.
+
+    Every ``snapshot_every`` events the current state is saved together with
+    ``dump_model(machine.model)`` and the log is truncated; ``load_model(model, data)``
+    restores the model from those bytes. Without the two functions the events are the only
+    record of the model, so no snapshots are taken and the log is kept whole.
+
+    Event cargo is stored with pickle, so the log must only be read by trusted code."""
+
+    def __init__(
+        self,
+        machine: StateMachine,
+        directory: str,
+        group_size: int = 64,
+        snapshot_every: int = 10_000,
+        dump_model: Optional[Callable[[object], bytes]] = None,
+        load_model: Optional[Callable[[object, bytes], None]] = None,
+    ):
+        if (dump_model is None) != (load_model is None):
+            raise ValueError("Pass both dump_model and load_model, or neither.")
+        self.machine = machine
+        self.dump_model = dump_model
+        self.load_model = load_model
+        self.directory = directory
+        self.group_size = group_size
+        self.snapshot_every = snapshot_every
+        self.sequence = 0
+        self._pending: List[bytes] = []
+        self._since_snapshot = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._log_path = os.path.join(directory, LOG_FILE)
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        valid_length = self._recover()
+        self._log = open(self._log_path, "ab")
+        # drop a torn record at the end of the log
+        self._log.truncate(valid_length)
+
+    def _recover(self) -> int:
+        """Restores the snapshot and replays the log, returns the length of the valid log."""
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, "rb") as file:
+                data = file.read()
+            magic, self.sequence = _SNAPSHOT.unpack_from(data)
+            if magic != _MAGIC:
+                raise ValueError(f"{self._snapshot_path} is not a machine snapshot.")
+            if self.load_model is None:
+                raise ValueError(f"{self._snapshot_path} holds model data, pass load_model to restore it.")
+            self.load_model(self.machine.model, load_state(self.machine, data[_SNAPSHOT.size :]))
+
+        if not os.path.exists(self._log_path):
+            return 0
+        with open(self._log_path, "rb") as file:
+            data = file.read()
+        valid_length = 0
+        for valid_length, sequence, event in _decode(data):
+            # records already contained in the snapshot, if compaction was interrupted
+            if sequence > self.sequence:
+                self.machine.process(event)
+                self.sequence = sequence
+                self._since_snapshot += 1
+        return valid_length
+
+    @property
+    def current_state(self):
+        """The current state of the wrapped machine."""
+        return self.machine.current_state
+
+    def process(self, event: Event):
+        """Applies the event to the machine, logs it and commits or snapshots when due."""
+        self.machine.process(event)
+        self.sequence += 1
+        self._pending.append(_encode(self.sequence, event))
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every and self.dump_model is not None:
+            self.snapshot()
+        elif len(self._pending) >= self.group_size:
+            self.commit()
+
+    def commit(self):
+        """Writes the buffered log records and waits until they are on disk."""
+        if not self._pending:
+            return
+        self._log.write(b"".join(self._pending))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._pending.clear()
+
+    def snapshot(self):
+        """Saves the current state and the model and truncates the log. Only commits without
+        ``dump_model``."""
+        self.commit()
+        if self.dump_model is None:
+            return
+        model_data = self.dump_model(self.machine.model)
+        temporary = self._snapshot_path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(_SNAPSHOT.pack(_MAGIC, self.sequence) + dump_state(self.machine, model_data))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self._snapshot_path)
+        _fsync_directory(self.directory)
+        self._log.truncate(0)
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._since_snapshot = 0
+
+    def close(self, snapshot: bool = False):
+        """Commits pending records, optionally saves a snapshot, and closes the log."""
+        if snapshot:
+            self.snapshot()
+        else:
+            self.commit()
+        self._log.close()
+
+    def __enter__(self) -> "DurableMachine":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_log(directory: str) -> List[Tuple[int, Event]]:
+    """Returns the (sequence, event) records of a log, e.g. for inspection."""
+    path = os.path.join(directory, LOG_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as file:
+        data = file.read()
+    return [(sequence, event) for _, sequence, event in _decode(data)]
@@ -0,0 +1,114 @@
+"""Events and the registry that interns their names."""
+
+from typing import Dict, List
+
+
+class Event:
+    """Template for events. Each event has a name and an optional cargo.
+
+    Event names are interned: each name is assigned a small integer ``id`` once, and events
+    compare and hash by that id. Events without cargo are singletons, so ``Event("start")``
+    returns the same object every time; these shared events cannot be modified.
+
+    Registered names are kept for the lifetime of the process. At most ``max_names`` names can
+    be registered, so event names should come from a fixed vocabulary, not from arbitrary
+    input; data belongs in the cargo."""
+
+    __slots__ = ("name", "cargo", "id")
+
+    max_names = 65_536
+
+    _ids: Dict[str, int] = {}
+    _names: List[str] = []
+    _singletons: Dict[str, "Event"] = {}
+
+    def __new__(cls, name: str, cargo=None, *args, **kwargs):
+        if cargo is None and cls is Event:
+            event = Event._singletons.get(name)
+            if event is None:
+                event = Event._singletons[name] = _SharedEvent._create(name)
+            return event
+        return object.__new__(cls)
+
+    def __init__(self, name: str, cargo=None):
+        self.name = name
+        self.cargo = cargo
+        event_id = Event._ids.get(name)
+        self.id = event_id if event_id is not None else Event.intern(name)
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __repr__(self) -> str:
+        return f"Event({self.name}, {self.cargo})"
+
+    def __eq__(self, other):
+        if isinstance(other, Event):
+            return self.id == other.id
+        return NotImplemented
+
+    # Necessary when __eq__ is defined to allow events to be a dictionary key
+    def __hash__(self) -> int:
+        return self.id
+
+    def __reduce__(self):
+        # ids are local to the interpreter, so events are rebuilt from their name
+        return self.__class__, (self.name, self.cargo)
+
+    @classmethod
+    def intern(cls, name: str) -> int:
+        """Returns the id of the event name, registering the name if it is new."""
+        event_id = Event._ids.get(name)
+        if event_id is None:
+            if len(Event._names) >= Event.max_names:
+                raise ValueError(f"Cannot register event {name!r}, {Event.max_names} names are registered.")
+            event_id = Event._ids[name] = len(Event._names)
+            Event._names.append(name)
+        return event_id
+
+    @classmethod
+    def name_of(cls, event_id: int) -> str:
+        """Returns the event name registered under the given id."""
+        return Event._names[event_id]
+
+    @classmethod
+    def count(cls) -> int:
+        """Returns the number of registered event names."""
+        return len(Event._names)
+
+    @classmethod
+    def declared(cls) -> List[str]:
+        """Returns the names assigned with set_names."""
+        return [name for name, value in vars(Event).items() if isinstance(value, Event)]
+
+    @classmethod
+    def set_names(cls, event_names: List[str]):
+        """Assigns each Event a given name independent of the object."""
+        for name in event_names:
+            existing = Event.__dict__.get(name)
+            if existing is not None and not isinstance(existing, Event):
+                raise ValueError(f"Event name {name!r} clashes with an attribute of Event.")
+            setattr(Event, name, Event(name))
+
+
+class _SharedEvent(Event):
+    """The singleton of an event name without cargo, shared by all users and read-only."""
+
+    __slots__ = ()
+
+    # already initialized by _create
+    __init__ = object.__init__
+
+    @classmethod
+    def _create(cls, name: str) -> "_SharedEvent":
+        event = object.__new__(cls)
+        object.__setattr__(event, "name", name)
+        object.__setattr__(event, "cargo", None)
+        object.__setattr__(event, "id", Event.intern(name))
+        return event
+
+    def __setattr__(self, name: str, value):
+        raise AttributeError(f"Event {self.name!r} without cargo is shared and cannot be modified.")
+
+    def __reduce__(self):
+        return Event, (self.name,)
@@ -0,0 +1,76 @@
+"""Memoized transitions of states whose process method is a pure function."""
+
+from typing import TYPE_CHECKING, Callable, Dict, Hashable, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .event import Event
+    from .statemachine import State
+
+# maps the cargo of an event to the part of it the next state depends on
+CargoKey = Callable[[object], Hashable]
+
+
+def _cargo(cargo: object) -> Hashable:
+    return cargo
+
+
+def pure(process: Optional[Callable] = None, *, key: Optional[CargoKey] = None) -> Callable:
+    """Marks ``State.process`` as pure: its result depends only on the state, the event name
+    and ``key(event.cargo)`` (the whole cargo by default, which must then be hashable).
+
+    Machines with ``enable_memo`` cache the next state of pure states and skip the call when
+    the same combination comes up again, so a pure process method must not have side effects.
+    Use as ``@pure`` or ``@pure(key=lambda cargo: cargo["kind"])``."""
+
+    def mark(function: Callable) -> Callable:
+        function.pure_key = key if key is not None else _cargo
+        return function
+
+    return mark(process) if process is not None else mark
+
+
+class TransitionMemo:
+    """A bounded cache of the next states decided by pure states, keyed by (state, event id,
+    cargo key). When it holds ``maxsize`` entries, the oldest one is evicted.
+
+    Install on a machine with ``StateMachine.enable_memo``."""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: Dict[Tuple["State", int, Hashable], "State"] = {}
+        # cargo key function per state class, None for states that are not pure
+        self._keys: Dict[type, Optional[CargoKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def process(self, state: "State", event: "Event") -> "State":
+        """Returns the next state, from the cache if the state is pure and was asked before."""
+        state_class = type(state)
+        try:
+            cargo_key = self._keys[state_class]
+        except KeyError:
+            cargo_key = self._keys[state_class] = getattr(state_class.process, "pure_key", None)
+        if cargo_key is None:
+            return state.process(event)
+
+        key = (state, event.id, cargo_key(event.cargo))
+        cache = self._cache
+        next_state = cache.get(key)
+        if next_state is not None:
+            self.hits += 1
+            return next_state
+        self.misses += 1
+        next_state = state.process(event)
+        if len(cache) >= self.maxsize:
+            del cache[next(iter(cache))]
+        cache[key] = next_state
+        return next_state
+
+    def clear(self):
+        """Discards the cached transitions and resets the counters."""
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
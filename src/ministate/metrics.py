@@ -0,0 +1,117 @@
+"""Per-transition counters and latency histograms."""
+
+from typing import Dict, List, Tuple
+
+from .event import Event
+
+# histogram buckets are powers of two in nanoseconds, from 2**6 (64 ns) to 2**30 (about 1 s)
+_FIRST_BUCKET = 6
+_BUCKETS = 25
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class TransitionMetrics:
+    """Collects event counts and processing latencies per (state, event).
+
+    Every event is counted. Reading the clock costs more than dispatching a table entry, so
+    only every ``sample_every``-th event of each (state, event) combination is timed; its
+    latency is sorted into power-of-two buckets. ``sample_every`` must be a power of two, 1
+    times every event.
+
+    Counters are kept by state id and event id; ``state_names`` maps state ids to names for
+    export. Install on a machine with ``StateMachine.enable_metrics``, a collector shared by
+    several machines needs machines with the same states."""
+
+    def __init__(self, sample_every: int = 64):
+        if sample_every < 1 or sample_every & (sample_every - 1):
+            raise ValueError("sample_every must be a power of two.")
+        self.sample_every = sample_every
+        self.state_names: List[str] = []
+        # per state id, the number of events per event id
+        self.counts: List[List[int]] = []
+        # per (state id, event id): [timed events, total nanoseconds, bucket counts...]
+        self._samples: Dict[Tuple[int, int], List[int]] = {}
+
+    def bind(self, state_names: List[str]) -> List[List[int]]:
+        """Sets the names of the state ids and returns the count rows, one per state."""
+        self.state_names[:] = state_names
+        while len(self.counts) < len(state_names):
+            self.counts.append([0] * Event.count())
+        return self.counts
+
+    @staticmethod
+    def widen(row: List[int]):
+        """Extends a count row to the ids of all registered events."""
+        row.extend([0] * (Event.count() - len(row)))
+
+    def record(self, state_id: int, event_id: int, elapsed_ns: int):
+        """Adds one timed event."""
+        stats = self._samples.get((state_id, event_id))
+        if stats is None:
+            stats = self._samples[(state_id, event_id)] = [0] * (2 + _BUCKETS)
+        stats[0] += 1
+        stats[1] += elapsed_ns
+        bucket = elapsed_ns.bit_length() - _FIRST_BUCKET
+        stats[2 + (0 if bucket < 0 else bucket if bucket < _BUCKETS else _BUCKETS - 1)] += 1
+
+    def clear(self):
+        """Discards all recorded values."""
+        for row in self.counts:
+            row[:] = [0] * len(row)
+        self._samples.clear()
+
+    @staticmethod
+    def bucket_bounds() -> List[int]:
+        """Upper bounds of the histogram buckets in nanoseconds, the last one is open."""
+        return [2 ** (_FIRST_BUCKET + i) for i in range(_BUCKETS)]
+
+    def _entries(self):
+        """Yields (state name, event name, count, sample stats) for every counted combination."""
+        empty = [0] * (2 + _BUCKETS)
+        for state_id, row in enumerate(self.counts):
+            for event_id, count in enumerate(row):
+                if count:
+                    stats = self._samples.get((state_id, event_id), empty)
+                    yield self.state_names[state_id], Event.name_of(event_id), count, stats
+
+    def as_dict(self) -> Dict[str, Dict[str, dict]]:
+        """Returns the metrics nested by state name and event name. ``count`` is exact, the
+        other values describe the ``timed`` events."""
+        result: Dict[str, Dict[str, dict]] = {}
+        for state, event, count, stats in self._entries():
+            result.setdefault(state, {})[event] = {
+                "count": count,
+                "timed": stats[0],
+                "total_ns": stats[1],
+                "buckets": stats[2:],
+            }
+        return result
+
+    def to_prometheus(
+        self, name: str = "ministate_event_processing_seconds", counter: str = "ministate_events_total"
+    ) -> str:
+        """Returns the metrics in the Prometheus text exposition format: the exact event counts
+        as ``counter`` and the latencies of the timed events as histogram ``name``."""
+        bounds = [bound / 1e9 for bound in self.bucket_bounds()[:-1]]
+        entries = sorted(self._entries())
+        lines = [
+            f"# HELP {counter} Events processed, by state and event.",
+            f"# TYPE {counter} counter",
+        ]
+        for state, event, count, _ in entries:
+            lines.append(f'{counter}{{state="{_label(state)}",event="{_label(event)}"}} {count}')
+        lines.append(f"# HELP {name} Time spent processing an event, by state and event (sampled).")
+        lines.append(f"# TYPE {name} histogram")
+        for state, event, _, stats in entries:
+            labels = f'state="{_label(state)}",event="{_label(event)}"'
+            cumulative = 0
+            for bound, count in zip(bounds, stats[2:]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {stats[0]}')
+            lines.append(f"{name}_sum{{{labels}}} {stats[1] / 1e9:g}")
+            lines.append(f"{name}_count{{{labels}}} {stats[0]}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,250 @@
+"""Priority event queue used by the queued mode of the state machine."""
+
+import queue
+import threading
+import time
+from collections import deque
+from enum import Enum, IntEnum
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from .event import Event
+
+
+class Priority(IntEnum):
+    """Default priority levels, events with higher priority are processed first."""
+
+    NORMAL = 0
+    HIGH = 1
+
+
+class Overflow(Enum):
+    """What happens when an event is put into a full queue."""
+
+    DROP_NEWEST = 1  # the new event is discarded
+    DROP_OLDEST = 2  # the oldest event of the lowest non-empty priority is discarded
+    BLOCK = 3  # the producer waits for the consumer to make room
+
+
+class Coalesce(Enum):
+    """How an event is combined with a waiting event of the same name."""
+
+    KEEP_LATEST = 1  # the waiting event is replaced by the new one, at its position
+    KEEP_FIRST = 2  # the new event is discarded
+    MERGE_CARGO = 3  # the cargo becomes merge(waiting cargo, new cargo), at its position
+    DEBOUNCE = 4  # the latest event is queued once no new one arrived for a time window
+
+
+# a policy, or a policy with its merge function (MERGE_CARGO) or window in seconds (DEBOUNCE)
+CoalesceSpec = Union[Coalesce, Tuple[Coalesce, object]]
+
+
+class _Slot:
+    """Holds a coalesced event in a level, so later events of the same name can replace it."""
+
+    __slots__ = ("event",)
+
+    def __init__(self, event: Event):
+        self.event = event
+
+
+class EventQueue:
+    """A FIFO queue per priority level, the highest non-empty level is served first.
+
+    ``maxsize`` limits the number of waiting events over all levels, 0 means unbounded. With
+    ``Overflow.BLOCK`` the queue is guarded by a lock so producers in other threads can wait
+    for room, they raise ``queue.Full`` after ``timeout`` seconds. The other policies never
+    wait and count discarded events in ``dropped``.
+
+    ``coalesce`` maps event names to a ``Coalesce`` policy, e.g. ``{"reading":
+    Coalesce.KEEP_LATEST, "burst": (Coalesce.DEBOUNCE, 0.05)}``. Such events are combined
+    with a waiting event of the same name instead of being queued again, combined events are
+    counted in ``coalesced``. Debounced events wait outside the levels until their window ran
+    out on ``clock`` and are then queued behind the events that are already waiting. Other
+    events keep their order."""
+
+    def __init__(
+        self,
+        levels: int = len(Priority),
+        maxsize: int = 0,
+        overflow: Overflow = Overflow.DROP_NEWEST,
+        timeout: Optional[float] = None,
+        coalesce: Optional[Dict[str, CoalesceSpec]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._levels: List[Deque[Event]] = [deque() for _ in range(levels)]
+        # served from the highest priority down
+        self._order = self._levels[::-1]
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.timeout = timeout
+        self.dropped = 0
+        self._lock = threading.Condition() if overflow is Overflow.BLOCK else None
+        self.clock = clock
+        self.coalesced = 0
+        # (policy, merge function or window) per event id
+        self._coalesce: Dict[int, Tuple[Coalesce, object]] = {}
+        for name, spec in (coalesce or {}).items():
+            policy, argument = spec if isinstance(spec, tuple) else (spec, None)
+            if policy is Coalesce.MERGE_CARGO and not callable(argument):
+                raise ValueError(f"MERGE_CARGO for {name!r} needs a merge function.")
+            if policy is Coalesce.DEBOUNCE and argument is None:
+                raise ValueError(f"DEBOUNCE for {name!r} needs a window in seconds.")
+            self._coalesce[Event.intern(name)] = (policy, argument)
+        # waiting coalesced events by event id
+        self._slots: Dict[int, _Slot] = {}
+        # debounced events by event id: [event, due time, priority]
+        self._debounced: Dict[int, list] = {}
+
+    def __len__(self) -> int:
+        # no running counter, keeping one up to date costs more than summing a few levels
+        return sum(map(len, self._levels)) + len(self._debounced)
+
+    def put(self, event: Event, priority: int = Priority.NORMAL) -> bool:
+        """Adds an event, returns False if it was discarded because the queue is full. Events
+        combined with a waiting one count as accepted."""
+        if self._lock is not None:
+            with self._lock:
+                if self._coalesce and event.id in self._coalesce and self._combine(event, priority):
+                    return True
+                if self.maxsize and len(self) >= self.maxsize:
+                    if not self._lock.wait_for(lambda: len(self) < self.maxsize, self.timeout):
+                        raise queue.Full
+                self._append(event, priority)
+            return True
+
+        if self._coalesce and event.id in self._coalesce and self._combine(event, priority):
+            return True
+        if self.maxsize and len(self) >= self.maxsize:
+            self.dropped += 1
+            if self.overflow is Overflow.DROP_NEWEST:
+                return False
+            self._drop_oldest()
+        self._append(event, priority)
+        return True
+
+    def _combine(self, event: Event, priority: int) -> bool:
+        """Applies the coalescing policy, returns True if the event needs no new entry."""
+        policy, argument = self._coalesce[event.id]
+        if policy is Coalesce.DEBOUNCE:
+            waiting = self._debounced.get(event.id)
+            if waiting is None:
+                return False
+            waiting[0] = event
+            waiting[1] = self.clock() + argument
+            self.coalesced += 1
+            return True
+        slot = self._slots.get(event.id)
+        if slot is None:
+            return False
+        if policy is Coalesce.KEEP_LATEST:
+            slot.event = event
+        elif policy is Coalesce.MERGE_CARGO:
+            slot.event = Event(event.name, argument(slot.event.cargo, event.cargo))
+        self.coalesced += 1
+        return True
+
+    def _append(self, event: Event, priority: int):
+        if self._coalesce and event.id in self._coalesce:
+            policy, argument = self._coalesce[event.id]
+            if policy is Coalesce.DEBOUNCE:
+                self._debounced[event.id] = [event, self.clock() + argument, priority]
+                return
+            slot = self._slots[event.id] = _Slot(event)
+            self._levels[priority].append(slot)
+            return
+        self._levels[priority].append(event)
+
+    def put_many(self, events: Iterable[Event], priority: int = Priority.NORMAL) -> int:
+        """Adds several events with the same priority, returns how many were accepted."""
+        if not self.maxsize and self._lock is None and not self._coalesce:
+            level = self._levels[priority]
+            before = len(level)
+            level.extend(events)
+            return len(level) - before
+        put = self.put
+        return sum(put(event, priority) for event in events)
+
+    def _drop_oldest(self):
+        for level in self._levels:
+            if level:
+                item = level.popleft()
+                if type(item) is _Slot:
+                    del self._slots[item.event.id]
+                return
+        # only debounced events wait, drop the one due first
+        del self._debounced[min(self._debounced, key=lambda event_id: self._debounced[event_id][1])]
+
+    def pop(self) -> Optional[Event]:
+        """Removes and returns the next event, or None if the queue is empty."""
+        if self._lock is not None:
+            with self._lock:
+                event = self._pop()
+                self._lock.notify()
+            return event
+        return self._pop()
+
+    def _pop(self) -> Optional[Event]:
+        if self._debounced:
+            self._release()
+        for level in self._order:
+            if level:
+                item = level.popleft()
+                if type(item) is _Slot:
+                    del self._slots[item.event.id]
+                    return item.event
+                return item
+        return None
+
+    def _release(self):
+        """Queues the debounced events whose window ran out."""
+        now = self.clock()
+        due = [(waiting[1], event_id) for event_id, waiting in self._debounced.items() if waiting[1] <= now]
+        for _, event_id in sorted(due):
+            event, _, priority = self._debounced.pop(event_id)
+            self._levels[priority].append(event)
+
+    def drain(self, process: Callable[[Event], None]) -> int:
+        """Pops events and passes them to process until the queue is empty, including events
+        queued by process itself. Returns the number of processed events.
+
+        Debounced events whose window has not run out yet stay queued."""
+        if self._lock is not None or self._coalesce:
+            count = 0
+            event = self.pop()
+            while event is not None:
+                process(event)
+                count += 1
+                event = self.pop()
+            return count
+
+        count = 0
+        order = self._order
+        while True:
+            for index, level in enumerate(order):
+                if level:
+                    break
+            else:
+                return count
+            # serve this level until it is empty or process queued an event with higher priority
+            popleft = level.popleft
+            if index == 0:
+                while level:
+                    process(popleft())
+                    count += 1
+            elif index == 1:
+                top = order[0]
+                while level and not top:
+                    process(popleft())
+                    count += 1
+            else:
+                higher = order[:index]
+                while level and not any(higher):
+                    process(popleft())
+                    count += 1
+
+    def clear(self):
+        """Discards all waiting events."""
+        for level in self._levels:
+            level.clear()
+        self._slots.clear()
+        self._debounced.clear()
@@ -0,0 +1,100 @@
+"""Machines made of orthogonal regions that process events independently."""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+from .definition import NO_STATE, MachineDefinition
+from .statemachine import Event, State
+from .table import GUARDED, NO_TRANSITION, TransitionTable
+
+
+def _handles_all(table: TransitionTable) -> bool:
+    """True if a state of the table overrides State.process and may react to any event."""
+    return any(type(state).process is not State.process for state in table.states)
+
+
+class OrthogonalMachine:
+    """A machine whose state is the combination of the states of independent regions.
+
+    Each region is a MachineDefinition, e.g. connectivity, power and alarm of a device. The
+    composite state is a tuple with one state id per region. An event is only routed to the
+    regions with a table entry for it in any of their states, and to regions with states that
+    override ``State.process``; all others are skipped without a lookup."""
+
+    def __init__(
+        self,
+        regions: Dict[str, MachineDefinition],
+        model: Optional[object] = None,
+        initial: Optional[Dict[str, Union[State, str]]] = None,
+    ):
+        if any(any(definition.factories) for definition in regions.values()):
+            raise ValueError("Regions need state objects, State classes are not supported.")
+        self.regions: List[str] = list(regions)
+        self.definitions: List[MachineDefinition] = list(regions.values())
+        self._tables: List[TransitionTable] = [definition.table for definition in self.definitions]
+        # default to self if no model is given
+        self.model = model if model is not None else self
+        initial = initial or {}
+        self.state: Tuple[int, ...] = tuple(
+            definition.state_id(initial.get(name)) for name, definition in regions.items()
+        )
+
+        # region indices per event id, events without an entry go to the catch-all regions
+        catch_all = [i for i, table in enumerate(self._tables) if _handles_all(table)]
+        columns = max((table.columns for table in self._tables), default=0)
+        routes: List[List[int]] = [list(catch_all) for _ in range(columns)]
+        for i, table in enumerate(self._tables):
+            if i in catch_all:
+                continue
+            for row in table.rows:
+                for event_id, target in enumerate(row):
+                    if target != NO_TRANSITION and i not in routes[event_id]:
+                        routes[event_id].append(i)
+        self._routes: List[Tuple[int, ...]] = [tuple(sorted(route)) for route in routes]
+        self._catch_all: Tuple[int, ...] = tuple(catch_all)
+
+    def routes(self, event: Event) -> List[str]:
+        """Names of the regions the event is routed to."""
+        return [self.regions[i] for i in self._route(event)]
+
+    def _route(self, event: Event) -> Tuple[int, ...]:
+        try:
+            return self._routes[event.id]
+        except IndexError:
+            # event registered after the regions were built
+            return self._catch_all
+
+    @property
+    def current_states(self) -> Dict[str, Optional[State]]:
+        """The current state object per region."""
+        return {
+            name: None if state_id == NO_STATE else table.states[state_id]
+            for name, table, state_id in zip(self.regions, self._tables, self.state)
+        }
+
+    def process(self, event: Event):
+        """Processes the event in each region that handles it."""
+        state = self.state
+        changed = None
+        event_id = event.id
+        for i in self._route(event):
+            state_id = state[i]
+            if state_id == NO_STATE:
+                continue
+            table = self._tables[i]
+            try:
+                next_id = table.rows[state_id][event_id]
+            except IndexError:
+                next_id = NO_TRANSITION
+            if next_id == GUARDED:
+                next_id = table.take(state_id, event, self.model)
+            if next_id == NO_TRANSITION:
+                current = table.states[state_id]
+                current.model = self.model
+                # a state object or name, None stops the region
+                next_id = self.definitions[i].state_id(current.process(event))
+            if next_id != state_id:
+                if changed is None:
+                    changed = list(state)
+                changed[i] = next_id
+        if changed is not None:
+            self.state = tuple(changed)
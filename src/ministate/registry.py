@@ -0,0 +1,147 @@
+"""Keyed machines with LRU/TTL eviction to a local sqlite store."""
+
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple, Union
+
+from .definition import NO_STATE, Machine, MachineDefinition
+from .statemachine import Event, State
+
+
+class MachineRegistry:
+    """Routes events to one machine per key, e.g. per user or session, created on first use.
+
+    At most ``capacity`` machines are kept in memory, and with ``ttl`` machines idle for more
+    than ``ttl`` seconds are evicted as well. An evicted machine is spilled to the sqlite
+    database at ``path`` as the name of its current state and reloaded when its key gets the
+    next event. Spilled states are written in batches of ``batch_size`` and on ``flush``.
+
+    Only the state survives eviction: models are created by ``model_factory(key)`` whenever a
+    machine is created or reloaded, as are the state objects of a ``LazyMachine``. Keys must be
+    values sqlite can store, i.e. str, int, float or bytes."""
+
+    def __init__(
+        self,
+        definition: MachineDefinition,
+        path: str = ":memory:",
+        initial_state: Union[State, str, None] = None,
+        capacity: int = 10_000,
+        ttl: Optional[float] = None,
+        model_factory: Optional[Callable[[Hashable], object]] = None,
+        batch_size: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.definition = definition
+        self.initial_state = initial_state
+        self.capacity = capacity
+        self.ttl = ttl
+        self.model_factory = model_factory
+        self.batch_size = batch_size
+        self.clock = clock
+        self.evicted = 0
+        # key -> (machine, time of last use), least recently used first
+        self._machines: "OrderedDict[Hashable, Tuple[Machine, float]]" = OrderedDict()
+        # spilled state names not yet written to the database
+        self._pending: Dict[Hashable, Optional[str]] = {}
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS machines (key PRIMARY KEY, state TEXT)")
+
+    def __len__(self) -> int:
+        """Number of machines in memory."""
+        return len(self._machines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """True if the machine of the key is in memory."""
+        return key in self._machines
+
+    def get(self, key: Hashable) -> Machine:
+        """Returns the machine of a key, reloading or creating it if needed."""
+        now = self.clock()
+        entry = self._machines.get(key)
+        if entry is not None:
+            self._machines.move_to_end(key)
+            machine = entry[0]
+        else:
+            machine = self._load(key)
+            if len(self._machines) >= self.capacity:
+                self._evict(self._machines.popitem(last=False))
+        self._machines[key] = (machine, now)
+        if self.ttl is not None:
+            self.evict_idle(now)
+        return machine
+
+    def dispatch(self, key: Hashable, event: Event):
+        """Processes the event with the machine of the key."""
+        self.get(key).process(event)
+
+    def _load(self, key: Hashable) -> Machine:
+        if key in self._pending:
+            state = self._pending.pop(key)
+        else:
+            row = self._db.execute("SELECT state FROM machines WHERE key = ?", (key,)).fetchone()
+            state = self.initial_state if row is None else row[0]
+        model = self.model_factory(key) if self.model_factory is not None else None
+        return self.definition.create(model, state)
+
+    def _evict(self, item: Tuple[Hashable, Tuple[Machine, float]]):
+        key, (machine, _) = item
+        # by id, reading current_state would create the state object of a LazyMachine
+        state_id = machine.state_id
+        self._pending[key] = None if state_id == NO_STATE else self.definition.states[state_id].name
+        self.evicted += 1
+        if len(self._pending) >= self.batch_size:
+            self._write()
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Spills machines that were idle for longer than ``ttl``, returns their number."""
+        if self.ttl is None:
+            return 0
+        deadline = (self.clock() if now is None else now) - self.ttl
+        count = 0
+        machines = self._machines
+        while machines:
+            key, (_, last_used) = next(iter(machines.items()))
+            if last_used >= deadline:
+                break
+            self._evict(machines.popitem(last=False))
+            count += 1
+        return count
+
+    def _write(self):
+        if self._pending:
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO machines (key, state) VALUES (?, ?)", self._pending.items()
+                )
+            self._pending.clear()
+
+    def flush(self):
+        """Writes the spilled states that are still buffered."""
+        self._write()
+
+    def spilled(self) -> Iterator[Tuple[Hashable, Optional[str]]]:
+        """Yields (key, state name) of the machines that are not in memory."""
+        self._write()
+        for key, state in self._db.execute("SELECT key, state FROM machines"):
+            if key not in self._machines:
+                yield key, state
+
+    def keys(self) -> List[Hashable]:
+        """Keys of the machines in memory, least recently used first."""
+        return list(self._machines)
+
+    def close(self, spill: bool = True):
+        """Closes the store. With ``spill`` the machines in memory are written as well, so a
+        registry on the same path continues where this one stopped."""
+        if spill:
+            while self._machines:
+                self._evict(self._machines.popitem(last=False))
+        self._write()
+        self._db.close()
+
+    def __enter__(self) -> "MachineRegistry":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
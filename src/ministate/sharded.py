@@ -0,0 +1,192 @@
+"""Many state machines spread over a pool of worker processes."""
+
+import multiprocessing
+import os
+import queue
+import traceback
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .statemachine import Event, StateMachine
+
+
+class ShardError(RuntimeError):
+    """A worker process failed or exited, the runtime cannot be used any more."""
+
+
+def _current_states(machines: Dict[Hashable, StateMachine]) -> Dict[Hashable, Optional[str]]:
+    return {
+        key: None if machine.current_state is None else machine.current_state.name
+        for key, machine in machines.items()
+    }
+
+
+def _shard_main(shard: int, connection, results, factory: Callable, snapshot_every: int):
+    """Worker process: owns the machines of one shard and applies batches of events.
+
+    Results are (shard, kind, payload): states as "periodic" or "answer", or the traceback of
+    an exception as "error", after which the worker exits."""
+    machines: Dict[Hashable, StateMachine] = {}
+    batches = 0
+    try:
+        while True:
+            try:
+                kind, payload = connection.recv()
+            except EOFError:
+                # the parent closed its end
+                return
+            if kind == "batch":
+                for key, event in payload:
+                    machine = machines.get(key)
+                    if machine is None:
+                        machine = machines[key] = factory(key)
+                    machine.process(event)
+                batches += 1
+                if snapshot_every and batches % snapshot_every == 0:
+                    results.put((shard, "periodic", _current_states(machines)))
+            elif kind == "snapshot":
+                results.put((shard, "answer", _current_states(machines)))
+            elif kind == "close":
+                results.put((shard, "answer", _current_states(machines)))
+                return
+    except Exception:
+        results.put((shard, "error", traceback.format_exc()))
+
+
+class ShardedRuntime:
+    """Routes events to machines that live in worker processes, one shard per process.
+
+    ``factory(key)`` creates the machine for a key on its first event, inside the worker, so
+    it must be picklable (e.g. a module level function). Events are buffered per shard and
+    sent in batches of ``batch_size``. Current state names come back in ``states``: on
+    ``snapshot``, and every ``snapshot_every`` batches per shard if that is set.
+
+    If a worker raises or dies, the next call that receives results raises ``ShardError``;
+    while waiting for answers the workers are checked every ``poll_interval`` seconds."""
+
+    def __init__(
+        self,
+        factory: Callable[[Hashable], StateMachine],
+        shards: Optional[int] = None,
+        batch_size: int = 256,
+        snapshot_every: int = 0,
+        context: Optional[str] = None,
+        poll_interval: float = 0.1,
+    ):
+        ctx = multiprocessing.get_context(context)
+        shards = shards or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.states: Dict[Hashable, Optional[str]] = {}
+        self._failed = False
+        self._results = ctx.Queue()
+        self._connections = []
+        self._processes = []
+        self._buffers: List[List[Tuple[Hashable, Event]]] = [[] for _ in range(shards)]
+        for shard in range(shards):
+            parent_end, child_end = ctx.Pipe()
+            process = ctx.Process(
+                target=_shard_main,
+                args=(shard, child_end, self._results, factory, snapshot_every),
+                daemon=True,
+            )
+            process.start()
+            child_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+
+    def __enter__(self) -> "ShardedRuntime":
+        return self
+
+    def __exit__(self, *exc: Any):
+        self.close()
+
+    def shard_of(self, key: Hashable) -> int:
+        """Returns the shard that owns the machine for the key."""
+        return hash(key) % len(self._connections)
+
+    def dispatch(self, key: Hashable, event: Event):
+        """Sends the event to the machine for the key, batches are sent when full."""
+        shard = hash(key) % len(self._connections)
+        buffer = self._buffers[shard]
+        buffer.append((key, event))
+        if len(buffer) >= self.batch_size:
+            self._send_batch(shard)
+
+    def flush(self):
+        """Sends all buffered events."""
+        for shard, buffer in enumerate(self._buffers):
+            if buffer:
+                self._send_batch(shard)
+
+    def _send(self, shard: int, message: Tuple[str, Any]):
+        try:
+            self._connections[shard].send(message)
+        except OSError as error:
+            # the worker is gone, report why if it said so
+            self._collect()
+            self._fail(f"Shard {shard} cannot receive events: {error}.")
+
+    def _send_batch(self, shard: int):
+        self._send(shard, ("batch", self._buffers[shard]))
+        self._buffers[shard] = []
+        self._collect()
+
+    def _fail(self, message: str):
+        self._failed = True
+        raise ShardError(message)
+
+    def _collect(self, waiting: Iterable[int] = ()):
+        """Stores states that arrived, waits until each shard in `waiting` answered."""
+        waiting = set(waiting)
+        while True:
+            try:
+                shard, kind, payload = self._results.get(block=bool(waiting), timeout=self.poll_interval)
+            except queue.Empty:
+                if not waiting:
+                    return
+                for shard in waiting:
+                    process = self._processes[shard]
+                    if not process.is_alive():
+                        # an error report may have arrived meanwhile
+                        self._collect()
+                        self._fail(f"Shard {shard} exited with code {process.exitcode}.")
+                continue
+            if kind == "error":
+                self._fail(f"Shard {shard} failed:\n{payload}")
+            self.states.update(payload)
+            if kind == "answer":
+                waiting.discard(shard)
+
+    def snapshot(self) -> Dict[Hashable, Optional[str]]:
+        """Flushes pending events and returns the current state name of every machine."""
+        self.flush()
+        for shard in range(len(self._connections)):
+            self._send(shard, ("snapshot", None))
+        self._collect(range(len(self._connections)))
+        return self.states
+
+    def close(self):
+        """Flushes pending events, stores the final states and stops the workers. After a
+        failure the workers are only stopped."""
+        if not self._processes:
+            return
+        try:
+            if not self._failed:
+                self.flush()
+                for shard in range(len(self._connections)):
+                    self._send(shard, ("close", None))
+                self._collect(range(len(self._connections)))
+        finally:
+            for connection in self._connections:
+                try:
+                    # workers may hold copies of other shards' pipes and never see them close
+                    connection.send(("close", None))
+                except OSError:
+                    pass
+                connection.close()
+            for process in self._processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+            self._processes = []
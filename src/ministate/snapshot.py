@@ -0,0 +1,89 @@
+"""Compact snapshots of the current state of state machines.
+
+A machine is stored as the index of its current state in ``machine.states``, two bytes per
+machine; machines of a ``MachineDefinition`` as their ``state_id``, without creating the states
+of a ``LazyMachine``. Restoring requires machines built with the same states in the same order."""
+
+import mmap
+import struct
+import sys
+from array import array
+from typing import Sequence, Union
+
+from .definition import NO_STATE as NO_STATE_ID, Machine
+from .statemachine import StateMachine
+
+# stored for machines without a current state
+NO_STATE = 0xFFFF
+
+AnyMachine = Union[StateMachine, Machine]
+
+_STATE = struct.Struct("<H")
+_HEADER = struct.Struct("<4sI")
+_MAGIC = b"MSTA"
+
+
+def state_id(machine: AnyMachine) -> int:
+    """Returns the index of the current state, NO_STATE if there is none."""
+    if isinstance(machine, Machine):
+        return NO_STATE if machine.state_id == NO_STATE_ID else machine.state_id
+    if machine.current_state is None:
+        return NO_STATE
+    return machine.states.index(machine.current_state)
+
+
+def set_state_id(machine: AnyMachine, index: int):
+    """Sets the current state from its index."""
+    if isinstance(machine, Machine):
+        machine.state_id = NO_STATE_ID if index == NO_STATE else index
+        return
+    machine.current_state = None if index == NO_STATE else machine.states[index]
+
+
+def dump_state(machine: AnyMachine, data: bytes = b"") -> bytes:
+    """Returns the snapshot of one machine, optionally followed by extra data."""
+    return _STATE.pack(state_id(machine)) + data
+
+
+def load_state(machine: AnyMachine, snapshot: bytes) -> bytes:
+    """Restores one machine from its snapshot and returns the extra data stored with it."""
+    (index,) = _STATE.unpack_from(snapshot)
+    set_state_id(machine, index)
+    return snapshot[_STATE.size :]
+
+
+def export_states(machines: Sequence[AnyMachine]) -> array:
+    """Returns the state indices of many machines in one contiguous array."""
+    return array("H", [state_id(machine) for machine in machines])
+
+
+def import_states(machines: Sequence[AnyMachine], states: Sequence[int]):
+    """Restores many machines from an array created with export_states."""
+    if len(states) != len(machines):
+        raise ValueError(f"Snapshot holds {len(states)} machines, got {len(machines)}.")
+    for machine, index in zip(machines, states):
+        set_state_id(machine, index)
+
+
+def save_states(path: str, machines: Sequence[AnyMachine]):
+    """Writes the states of many machines to a file."""
+    states = export_states(machines)
+    if sys.byteorder == "big":
+        states.byteswap()
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, len(states)))
+        file.write(states.tobytes())
+
+
+def load_states(path: str, machines: Sequence[AnyMachine]):
+    """Restores many machines from a file written by save_states, reading it memory-mapped."""
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        magic, count = _HEADER.unpack_from(mapped)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a state snapshot.")
+        with memoryview(mapped) as raw:
+            with raw[_HEADER.size : _HEADER.size + count * _STATE.size].cast("H") as states:
+                if sys.byteorder == "big":
+                    states = array("H", states)
+                    states.byteswap()
+                import_states(machines, states)
@@ -1,20 +1,40 @@
 """A minimalist state machine."""
 
-from abc import ABC, abstractmethod
-from typing import List, Optional, Dict
+from abc import ABC
+from itertools import islice
+from time import perf_counter_ns
+from typing import Callable, Iterable, Iterator, List, Optional, Dict, Tuple
+
+from .event import Event
+from .memo import TransitionMemo
+from .metrics import TransitionMetrics
+from .queues import EventQueue, Priority
+from .table import GUARDED, NO_TRANSITION, TransitionTable
 
 
 class State(ABC):
     """A State encodes a particular behavior of the state machine,
-    and decides the next state given the transitions table and the event."""
+    and decides the next state given the transitions table and the event.
+
+    A state can have a ``parent`` state. In a compiled machine, events without a table entry
+    for the state are looked up in the entries of its parent, grandparent and so on.
+
+    ``timeout`` (seconds) is used by ``timers.StateTimeouts`` to send a timeout event if the
+    machine stays in the state for that long."""
 
-    def __init__(self):
+    timeout: Optional[float] = None
+
+    def __init__(self, parent: Optional["State"] = None):
         self._model = None
         self.name = self.__class__.__name__
+        self.parent = parent
 
-    @abstractmethod
     def process(self, event: "Event") -> "State":
-        """Runs action and decides next state for the StateMachine"""
+        """Runs action and decides next state for the StateMachine.
+
+        The default stays in the current state, so states of compiled machines that are fully
+        described by the transitions table need no override."""
+        return self
 
     @property
     def model(self) -> object:
@@ -27,36 +47,23 @@ class State(ABC):
         self._model = model
 
 
-class Event:
-    """Template for events. Each event has a name and an optional cargo."""
-
-    def __init__(self, name: str, cargo=None):
-        self.name = name
-        self.cargo = cargo
-
-    def __str__(self) -> str:
-        return self.name
-
-    def __repr__(self) -> str:
-        return f"Event({self.name}, {self.cargo})"
-
-    def __eq__(self, other):
-        return self.name == other.name
+class StateMachine:
+    """A machine where the behavior is given by its current state.
+    Processes incoming events and switches to the next state.
 
-    # Necessary when __eq__ is defined to allow events to be a dictionary key
-    def __hash__(self) -> int:
-        return hash(self.name)
+    With ``compiled=True`` the transitions table is compiled into integer-indexed rows and
+    events found in the table switch the state directly. Only events without a table entry
+    are handed to ``State.process`` of the current state.
 
-    @classmethod
-    def set_names(cls, event_names: List[str]):
-        """Assigns each Event a given name independent of the object."""
-        for name in event_names:
-            setattr(Event, name, Event(name))
+    Events can also be queued with ``dispatch`` and processed later with ``run_until_idle``,
+    or consumed from iterables with ``feed`` and ``run_stream``.
+    Pass an ``EventQueue`` to configure priority levels, maximum depth and overflow policy.
 
+    Hooks (``add_hook``) and metrics (``enable_metrics``) wrap ``process`` only while any are
+    installed, a machine without them runs the plain method. With ``enable_memo`` the next
+    states decided by ``@pure`` states are cached."""
 
-class StateMachine:
-    """A machine where the behavior is given by its current state.
-    Processes incoming events and switches to the next state."""
+    HOOKS = ("on_enter", "on_exit", "on_transition")
 
     def __init__(
         self,
@@ -64,8 +71,19 @@ class StateMachine:
         states: Optional[List[State]] = None,
         transitions: Optional[Dict[str, Dict[str | type[Event], type[State]]]] = None,
         current_state: Optional[State] = None,
+        compiled: bool = False,
+        event_queue: Optional[EventQueue] = None,
     ):
         self._states: List[State] = []
+        self._table: Optional[TransitionTable] = None
+        # unpruned table for graph queries while _table is pruned
+        self._graph: Optional[TransitionTable] = None
+        self.compiled = compiled
+        self.event_queue = event_queue
+        self.metrics: Optional[TransitionMetrics] = None
+        self.memo: Optional[TransitionMemo] = None
+        self._metered: Optional[Callable[["Event"], None]] = None
+        self._hooks: Dict[str, List[Callable]] = {kind: [] for kind in self.HOOKS}
         # default to self if no model is given
         self.model = model if model is not None else self
         self.current_state = current_state
@@ -81,13 +99,318 @@ class StateMachine:
         state.model = self.model  # back-reference in state to the model
         self._states.append(state)
         setattr(self, state.name, state)
+        self._table = None
+        if self._metered is not None:
+            self._instrument()
 
     @property
     def states(self) -> List[State]:
         """Returns all possible states."""
         return self._states
 
+    @property
+    def transitions(self) -> Dict:
+        """The transitions table, keyed by state name and then by event."""
+        return self._transitions
+
+    @transitions.setter
+    def transitions(self, transitions: Dict) -> None:
+        """Replaces the transitions table, the compiled table is rebuilt on next use."""
+        self._transitions = transitions
+        self._table = None
+        if self._metered is not None:
+            self._instrument()
+
+    def compile(self, prune: bool = False) -> TransitionTable:
+        """Compiles the transitions table. Call again after modifying the table in place.
+
+        With ``prune`` the rows of states unreachable from the current state are dropped, see
+        ``TransitionTable.prune``. Should the machine still get into a pruned state, e.g. by
+        setting ``current_state``, the table is compiled again without pruning."""
+        self._table = TransitionTable(self._states, self._transitions)
+        self._graph = None
+        if prune and self.current_state is not None:
+            self._table.prune(self._table.state_index[self.current_state])
+        if self._metered is not None:
+            self._instrument()
+        return self._table
+
+    @property
+    def graph(self) -> TransitionTable:
+        """The compiled transitions table, for reachability and path queries. Never pruned."""
+        table = self._table if self._table is not None else self.compile()
+        if table.pruned:
+            if self._graph is None:
+                self._graph = TransitionTable(self._states, self._transitions)
+            return self._graph
+        return table
+
+    def validate(self, events: Optional[Iterable[str]] = None, strict: bool = True):
+        """Checks the transitions table for unknown states and events, unreachable states (from
+        the current state) and dead ends. Raises ValidationError on errors if ``strict``,
+        returns the ValidationReport otherwise. See ``validation.validate_transitions``."""
+        from .validation import ValidationError, validate_transitions
+
+        report = validate_transitions(self._states, self._transitions, self.current_state, events)
+        if strict and not report.ok:
+            raise ValidationError(report)
+        return report
+
+    def _lookup(self, event: "Event") -> Optional[State]:
+        """Returns the next state from the compiled table, or None if it has no entry."""
+        table = self._table if self._table is not None else self.compile()
+        try:
+            state_id = table.state_index[self.current_state]
+            next_id = table.rows[state_id][event.id]
+        except (KeyError, IndexError):
+            # a state that is not part of the machine, or an event registered after compiling
+            return None
+        if next_id == GUARDED:
+            next_id = table.take(state_id, event, self.model)
+        if next_id == NO_TRANSITION and state_id in table.pruned:
+            self.compile()
+            return self._lookup(event)
+        return None if next_id == NO_TRANSITION else table.states[next_id]
+
     def process(self, event: "Event"):
         """Processes the given event and switches to next state."""
-        if self.current_state is not None:
-            self.current_state = self.current_state.process(event)
+        if self.current_state is None:
+            return
+        if self.compiled:
+            table = self._table if self._table is not None else self.compile()
+            try:
+                state_id = table.state_index[self.current_state]
+            except KeyError:
+                # a state returned by State.process that was never added, it has no table row
+                state_id = None
+            if state_id is not None:
+                try:
+                    next_id = table.rows[state_id][event.id]
+                except IndexError:
+                    # event registered after the table was compiled
+                    next_id = NO_TRANSITION
+                if next_id == GUARDED:
+                    next_id = table.take(state_id, event, self.model)
+                if next_id != NO_TRANSITION:
+                    self.current_state = table.states[next_id]
+                    return
+                if state_id in table.pruned:
+                    # got into a pruned state, its rows are needed after all
+                    self.compile()
+                    return StateMachine.process(self, event)
+        if self.memo is not None:
+            self.current_state = self.memo.process(self.current_state, event)
+            return
+        self.current_state = self.current_state.process(event)
+
+    def add_hook(self, kind: str, callback: Callable):
+        """Registers a callback for one of the HOOKS.
+
+        ``on_exit(state, event)`` and ``on_enter(state, event)`` run when an event switched to
+        a different state, ``on_transition(source, event, target)`` runs for every event."""
+        if kind not in self._hooks:
+            raise ValueError(f"Unknown hook {kind!r}, expected one of {self.HOOKS}.")
+        self._hooks[kind].append(callback)
+        self._instrument()
+
+    def remove_hook(self, kind: str, callback: Callable):
+        """Removes a callback registered with add_hook."""
+        self._hooks[kind].remove(callback)
+        self._instrument()
+
+    def enable_metrics(self, metrics: Optional[TransitionMetrics] = None) -> TransitionMetrics:
+        """Starts recording counts and latencies per state and event, returns the collector."""
+        self.metrics = metrics if metrics is not None else TransitionMetrics()
+        self._instrument()
+        return self.metrics
+
+    def disable_metrics(self):
+        """Stops recording metrics."""
+        self.metrics = None
+        self._instrument()
+
+    def enable_memo(self, memo: Optional[TransitionMemo] = None) -> TransitionMemo:
+        """Starts caching the next states of states with a ``@pure`` process method, returns
+        the cache with its hit and miss counters."""
+        self.memo = memo if memo is not None else TransitionMemo()
+        return self.memo
+
+    def disable_memo(self):
+        """Stops caching transitions."""
+        self.memo = None
+
+    def _instrument(self):
+        """Shadows process with the instrumented version while hooks or metrics are installed:
+        the metered closure for metrics only, the hook wrapper (around it) if there are hooks."""
+        self._metered = None
+        self._metered = self._metered_process() if self.metrics is not None else None
+        if any(self._hooks.values()):
+            self.process = self._process_instrumented
+        elif self._metered is not None:
+            self.process = self._metered
+        else:
+            self.__dict__.pop("process", None)
+
+    def _metered_process(self) -> Callable[["Event"], None]:
+        """Returns process counting events in the metrics by (state id, event id).
+
+        The states, compiled rows and counters are bound as locals of the closure and the table
+        lookup is inlined, so counting an event adds a few list operations to the plain method.
+        Sampled events, and all events of subclasses overriding ``process``, run the plain
+        method. ``add_state``, ``compile`` and setting the transitions rebuild the closure."""
+        machine = self
+        metrics = self.metrics
+        states = list(self._states)
+        counts = metrics.bind([state.name for state in states])
+        widen = metrics.widen
+        record = metrics.record
+        mask = metrics.sample_every - 1
+        plain = type(self).process
+        # the process method of this class, which only a subclass may override
+        inline = plain is StateMachine.process
+
+        if not self.compiled or not inline:
+            state_ids = {state: i for i, state in enumerate(states)}
+
+            def process(event: "Event"):
+                state = machine.current_state
+                try:
+                    state_id = state_ids[state]
+                except KeyError:
+                    # no state or a state object outside the machine, not counted
+                    return plain(machine, event)
+                event_id = event.id
+                row = counts[state_id]
+                try:
+                    count = row[event_id] + 1
+                except IndexError:
+                    widen(row)
+                    count = row[event_id] + 1
+                row[event_id] = count
+                if not count & mask:
+                    start = perf_counter_ns()
+                    plain(machine, event)
+                    record(state_id, event_id, perf_counter_ns() - start)
+                elif inline:
+                    memo = machine.memo
+                    machine.current_state = (
+                        state.process(event) if memo is None else memo.process(state, event)
+                    )
+                else:
+                    plain(machine, event)
+
+            return process
+
+        table = self._table if self._table is not None else self.compile()
+        state_index = table.state_index
+        rows = table.rows
+        take = table.take
+        pruned = table.pruned
+
+        def process_compiled(event: "Event"):
+            state = machine.current_state
+            try:
+                state_id = state_index[state]
+            except KeyError:
+                # no state or a state object outside the machine, not counted
+                return plain(machine, event)
+            event_id = event.id
+            row = counts[state_id]
+            try:
+                count = row[event_id] + 1
+            except IndexError:
+                widen(row)
+                count = row[event_id] + 1
+            row[event_id] = count
+            if not count & mask:
+                start = perf_counter_ns()
+                plain(machine, event)
+                record(state_id, event_id, perf_counter_ns() - start)
+                return
+            try:
+                next_id = rows[state_id][event_id]
+            except IndexError:
+                next_id = NO_TRANSITION
+            if next_id == GUARDED:
+                next_id = take(state_id, event, machine.model)
+            if next_id != NO_TRANSITION:
+                machine.current_state = states[next_id]
+                return
+            if state_id in pruned:
+                # compiles the table again without pruning, plain dispatches with it
+                machine.compile()
+                return plain(machine, event)
+            memo = machine.memo
+            machine.current_state = state.process(event) if memo is None else memo.process(state, event)
+
+        return process_compiled
+
+    def _process_instrumented(self, event: "Event"):
+        source = self.current_state
+        if source is None:
+            return
+        if self._metered is not None:
+            self._metered(event)
+        else:
+            type(self).process(self, event)
+
+        target = self.current_state
+        hooks = self._hooks
+        if target is not source:
+            for callback in hooks["on_exit"]:
+                callback(source, event)
+            for callback in hooks["on_enter"]:
+                callback(target, event)
+        for callback in hooks["on_transition"]:
+            callback(source, event, target)
+
+    def dispatch(self, event: "Event", priority: int = Priority.NORMAL) -> bool:
+        """Queues the event, returns False if the queue discarded it."""
+        if self.event_queue is None:
+            self.event_queue = EventQueue()
+        return self.event_queue.put(event, priority)
+
+    def dispatch_many(self, events: Iterable["Event"], priority: int = Priority.NORMAL) -> int:
+        """Queues several events with the same priority, returns how many were accepted."""
+        if self.event_queue is None:
+            self.event_queue = EventQueue()
+        return self.event_queue.put_many(events, priority)
+
+    def feed(
+        self, events: Iterable["Event"], chunk_size: int = 256, skip_self: bool = False
+    ) -> Iterator[Tuple[Optional[State], "Event", Optional[State]]]:
+        """Processes events from any iterable, e.g. a generator over a log file, and yields a
+        (source, event, target) transition per event. With ``skip_self`` events that leave
+        the machine in the same state are not yielded.
+
+        Events are taken from the iterable and processed ``chunk_size`` at a time, so the
+        machine runs up to one chunk ahead of the consumer and memory stays bounded."""
+        iterator = iter(events)
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                return
+            process = self.process
+            transitions = []
+            for event in chunk:
+                source = self.current_state
+                process(event)
+                target = self.current_state
+                if target is not source or not skip_self:
+                    transitions.append((source, event, target))
+            yield from transitions
+
+    def run_stream(self, events: Iterable["Event"]) -> int:
+        """Processes all events from an iterable without keeping them, returns their number."""
+        process = self.process
+        count = 0
+        for count, event in enumerate(events, 1):
+            process(event)
+        return count
+
+    def run_until_idle(self) -> int:
+        """Processes queued events, including those queued meanwhile, until the queue is empty.
+        Returns the number of processed events."""
+        if self.event_queue is None:
+            return 0
+        return self.event_queue.drain(self.process)
@@ -0,0 +1,291 @@
+"""Compiled transition tables for the state machine."""
+
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple, Union
+
+from .event import Event
+
+if TYPE_CHECKING:
+    from .statemachine import State
+
+# marks a (state, event) combination that is not covered by the transitions table
+NO_TRANSITION = -1
+# marks a combination whose transitions have guards or actions, see TransitionTable.take
+GUARDED = -2
+
+# guard or action, called with the model and the event
+Callback = Callable[[object, Event], object]
+
+
+def event_name(event) -> str:
+    """Returns the name of an event given either as Event or as plain string."""
+    return event if isinstance(event, str) else event.name
+
+
+class Transition:
+    """A transition target with an optional guard and action, for use in transitions tables.
+
+    The transition is taken if ``guard(model, event)`` returns true or if there is no guard;
+    ``action(model, event)`` then runs before the machine switches to ``target``. A list of
+    Transitions for one event is tried in order, up to the first one without a guard."""
+
+    __slots__ = ("target", "guard", "action")
+
+    def __init__(self, target, guard: Optional[Callback] = None, action: Optional[Callback] = None):
+        self.target = target
+        self.guard = guard
+        self.action = action
+
+    def __repr__(self) -> str:
+        return f"Transition({self.target!r}, guard={self.guard!r}, action={self.action!r})"
+
+
+class TransitionTable:
+    """A transitions dictionary compiled into dense integer-indexed rows.
+
+    States are numbered in the order they were added and events by their interned ``Event.id``,
+    so the next state is found with ``rows[state_id][event.id]``. Combinations without an entry
+    hold ``NO_TRANSITION``. Rows only reach up to the highest event id used by the table or
+    given in ``events``; lookups of other events find no entry.
+
+    Rows of states with a ``parent`` are flattened at build time: entries missing in a state's
+    own row are taken from its nearest ancestor that has one, so nesting costs nothing when
+    events are dispatched.
+
+    Entries given as ``Transition`` objects with guards or actions hold ``GUARDED``, their
+    edges are kept in ``edges`` and evaluated by ``take``. Plain entries never touch them.
+
+    The table also answers graph queries (``reachable``, ``shortest_path``, ``components``).
+    Results are memoized; a machine builds a new table whenever its states or transitions
+    change, which discards them."""
+
+    def __init__(self, states: List["State"], transitions: Dict, events: Iterable = ()):
+        self.states: List["State"] = list(states)
+        self.state_ids: Dict[str, int] = {state.name: i for i, state in enumerate(self.states)}
+        # keyed by the state object itself, which hashes by identity
+        self.state_index: Dict["State", int] = {state: i for i, state in enumerate(self.states)}
+
+        event_ids = [Event.intern(event_name(event)) for row in transitions.values() for event in row]
+        event_ids.extend(Event.intern(event_name(event)) for event in events)
+        # names registered for other tables do not widen this one
+        self.columns = max(event_ids, default=-1) + 1
+
+        self.rows: List[List[int]] = [[NO_TRANSITION] * self.columns for _ in self.states]
+        # ids of the states whose rows were dropped by prune
+        self.pruned: FrozenSet[int] = frozenset()
+        # (guard, action, target id) per GUARDED entry, keyed by (state id, event id)
+        self.edges: Dict[Tuple[int, int], List[Tuple[Optional[Callback], Optional[Callback], int]]] = {}
+        for state_name, row in transitions.items():
+            if state_name not in self.state_ids:
+                raise ValueError(f"Transitions refer to unknown state {state_name!r}.")
+            state_id = self.state_ids[state_name]
+            for event, target in row.items():
+                self._add_entry(state_id, Event.intern(event_name(event)), target)
+
+        self.parents: List[int] = [
+            NO_TRANSITION if state.parent is None else self._target_id(state.parent) for state in self.states
+        ]
+        if any(parent != NO_TRANSITION for parent in self.parents):
+            self._flatten()
+        self._clear_queries()
+
+    def _clear_queries(self):
+        self._reachable: Dict[int, FrozenSet[int]] = {}
+        self._paths: Dict[Tuple[int, int], Optional[List[str]]] = {}
+        self._predecessors: Dict[int, Dict[int, Tuple[int, int]]] = {}
+        self._components: Optional[List[FrozenSet[str]]] = None
+
+    def _flatten(self):
+        """Fills missing entries of each row from the rows of its ancestors."""
+        own_rows = [list(row) for row in self.rows]
+        for state_id in range(len(self.states)):
+            chain = [state_id]
+            while self.parents[chain[-1]] != NO_TRANSITION:
+                parent = self.parents[chain[-1]]
+                if parent in chain:
+                    raise ValueError(f"State {self.states[state_id].name!r} is its own ancestor.")
+                chain.append(parent)
+            row = self.rows[state_id]
+            for ancestor in chain[1:]:
+                for event_id, target in enumerate(own_rows[ancestor]):
+                    if row[event_id] == NO_TRANSITION:
+                        row[event_id] = target
+                        if target == GUARDED:
+                            self.edges[(state_id, event_id)] = self.edges[(ancestor, event_id)]
+
+    def _add_entry(self, state_id: int, event_id: int, target):
+        """Stores a plain target in the row, or the edges of Transition objects."""
+        if not isinstance(target, (Transition, list, tuple)):
+            self.rows[state_id][event_id] = self._target_id(target)
+            return
+        edges = []
+        for transition in [target] if isinstance(target, Transition) else target:
+            edges.append((transition.guard, transition.action, self._target_id(transition.target)))
+            if transition.guard is None:
+                # later transitions can never be reached
+                break
+        if len(edges) == 1 and edges[0][0] is None and edges[0][1] is None:
+            self.rows[state_id][event_id] = edges[0][2]
+        else:
+            self.rows[state_id][event_id] = GUARDED
+            self.edges[(state_id, event_id)] = edges
+
+    def _target_id(self, target) -> int:
+        """Resolves a transition target given as State or state name."""
+        name = target if isinstance(target, str) else target.name
+        try:
+            return self.state_ids[name]
+        except KeyError:
+            raise ValueError(f"Transition target {name!r} is not a state of this machine.") from None
+
+    def take(self, state_id: int, event: Event, model: object) -> int:
+        """Evaluates the guards of a GUARDED entry in order and runs the action of the first
+        transition taken. Returns its target id, or NO_TRANSITION if no guard passed."""
+        for guard, action, target in self.edges[(state_id, event.id)]:
+            if guard is None or guard(model, event):
+                if action is not None:
+                    action(model, event)
+                return target
+        return NO_TRANSITION
+
+    def _resolve(self, state: Union["State", str, int]) -> int:
+        if isinstance(state, int):
+            return state
+        return self.state_ids[state if isinstance(state, str) else state.name]
+
+    def _out_edges(self, state_id: int) -> List[Tuple[int, int]]:
+        """Returns (event id, target id) for all entries of a row, guarded ones included."""
+        result = []
+        for event_id, target in enumerate(self.rows[state_id]):
+            if target >= 0:
+                result.append((event_id, target))
+            elif target == GUARDED:
+                result.extend(
+                    (event_id, edge_target) for _, _, edge_target in self.edges[(state_id, event_id)]
+                )
+        return result
+
+    def successors(self, state_id: int) -> Set[int]:
+        """Returns the ids of the states the table can switch to from the given state."""
+        return {target for _, target in self._out_edges(state_id)}
+
+    def reachable(self, state: Union["State", str, int]) -> FrozenSet[int]:
+        """Returns the ids of all states reachable from the given state, including itself."""
+        state_id = self._resolve(state)
+        reached = self._reachable.get(state_id)
+        if reached is None:
+            reached = self._reachable[state_id] = frozenset(self._search(state_id))
+        return reached
+
+    def _search(self, state_id: int) -> Dict[int, Tuple[int, int]]:
+        """Breadth-first search, returns the (previous state, event id) per reached state."""
+        predecessors = self._predecessors.get(state_id)
+        if predecessors is None:
+            predecessors = {state_id: (NO_TRANSITION, NO_TRANSITION)}
+            pending = deque([state_id])
+            while pending:
+                current = pending.popleft()
+                for event_id, target in self._out_edges(current):
+                    if target not in predecessors:
+                        predecessors[target] = (current, event_id)
+                        pending.append(target)
+            self._predecessors[state_id] = predecessors
+        return predecessors
+
+    def shortest_path(
+        self, source: Union["State", str, int], target: Union["State", str, int]
+    ) -> Optional[List[str]]:
+        """Returns the shortest sequence of event names that leads from source to target, or
+        None if target cannot be reached. Guards are assumed to pass."""
+        key = (self._resolve(source), self._resolve(target))
+        if key not in self._paths:
+            predecessors = self._search(key[0])
+            path = None
+            if key[1] in predecessors:
+                path = []
+                current = key[1]
+                while current != key[0]:
+                    current, event_id = predecessors[current]
+                    path.append(Event.name_of(event_id))
+                path.reverse()
+            self._paths[key] = path
+        path = self._paths[key]
+        return None if path is None else list(path)
+
+    def components(self) -> List[FrozenSet[str]]:
+        """Returns the strongly connected components as sets of state names."""
+        if self._components is None:
+            self._components = [
+                frozenset(self.states[state_id].name for state_id in component)
+                for component in self._strongly_connected()
+            ]
+        return list(self._components)
+
+    def _strongly_connected(self) -> List[List[int]]:
+        """Tarjan's algorithm, iterative to avoid the recursion limit on large machines."""
+        index: Dict[int, int] = {}
+        lowlink: Dict[int, int] = {}
+        stack: List[int] = []
+        on_stack: Set[int] = set()
+        result: List[List[int]] = []
+        for root in range(len(self.states)):
+            if root in index:
+                continue
+            work = [(root, iter(sorted(self.successors(root))))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = lowlink[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self.successors(child)))))
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        result.append(sorted(component))
+        return result
+
+    def prune(self, initial_id: int) -> int:
+        """Replaces the rows of states that cannot be reached from the initial state by one
+        shared empty row, returns the number of pruned rows. Events for a pruned state are
+        left to its ``State.process``. A pruned table only serves dispatch, graph queries on it
+        no longer see the pruned rows.
+
+        Reachability only follows table entries. If a reachable state overrides
+        ``State.process``, it may switch to any state, so nothing is pruned."""
+        from .statemachine import State
+
+        reached = self.reachable(initial_id)
+        if any(type(self.states[state_id]).process is not State.process for state_id in reached):
+            return 0
+        empty = [NO_TRANSITION] * self.columns
+        self.pruned = frozenset(range(len(self.states))) - reached
+        for state_id in self.pruned:
+            self.rows[state_id] = empty
+        self.edges = {key: edges for key, edges in self.edges.items() if key[0] in reached}
+        self._clear_queries()
+        return len(self.pruned)
+
+    def lookup(self, state_id: int, event) -> int:
+        """Returns the table entry: the id of the next state, NO_TRANSITION or GUARDED."""
+        event_id = Event.intern(event) if isinstance(event, str) else event.id
+        if event_id >= self.columns:
+            return NO_TRANSITION
+        return self.rows[state_id][event_id]
@@ -0,0 +1,262 @@
+"""State timeouts and scheduled events driven by a shared hierarchical timing wheel."""
+
+import asyncio
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+from .statemachine import Event, State, StateMachine
+
+
+class Timer:
+    """A scheduled callback, returned by TimingWheel.schedule and used to cancel it."""
+
+    __slots__ = ("deadline", "callback", "bucket")
+
+    def __init__(self, deadline: int, callback: Callable[[], None]):
+        self.deadline = deadline
+        self.callback = callback
+        self.bucket: Optional[Set["Timer"]] = None
+
+    @property
+    def active(self) -> bool:
+        """True until the timer fired or was cancelled."""
+        return self.bucket is not None
+
+
+class TimingWheel:
+    """A hierarchical timing wheel with ``levels`` wheels of ``size`` slots each.
+
+    Time advances in ticks of ``resolution`` seconds. A slot of level k spans size**k ticks;
+    timers are placed on the lowest level that covers their deadline and move down a level
+    when the wheel above reaches their slot. Scheduling and cancelling are O(1), callbacks run
+    inside ``advance``, which a driver calls regularly (see ``run`` and ``AsyncTimingWheel``).
+
+    The wheel is guarded by a lock, so timers can be scheduled and cancelled from other threads
+    than the driver. Callbacks run on the driver's thread, outside the lock."""
+
+    def __init__(
+        self,
+        resolution: float = 0.01,
+        size: int = 256,
+        levels: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.resolution = resolution
+        self.size = size
+        self.clock = clock
+        self._spans = [size**level for level in range(levels + 1)]
+        self._wheels: List[List[Set[Timer]]] = [[set() for _ in range(size)] for _ in range(levels)]
+        # beyond the range of the highest wheel
+        self._overflow: Set[Timer] = set()
+        self._tick = int(clock() / resolution)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> Timer:
+        """Runs callback after delay seconds, rounded up to whole ticks."""
+        with self._lock:
+            timer = Timer(self._tick + max(1, math.ceil(delay / self.resolution)), callback)
+            self._place(timer)
+            self._count += 1
+        return timer
+
+    def cancel(self, timer: Timer):
+        """Cancels a timer, does nothing if it already fired or was cancelled."""
+        with self._lock:
+            if timer.bucket is not None:
+                timer.bucket.discard(timer)
+                timer.bucket = None
+                self._count -= 1
+
+    def _place(self, timer: Timer):
+        delta = timer.deadline - self._tick
+        spans = self._spans
+        for level, wheel in enumerate(self._wheels):
+            if delta < spans[level + 1]:
+                bucket = wheel[(timer.deadline // spans[level]) % self.size]
+                break
+        else:
+            bucket = self._overflow
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Moves the wheel to the given time (default: the clock) and runs the callbacks of
+        all timers that are due. Returns the number of fired timers."""
+        target = int((self.clock() if now is None else now) / self.resolution)
+        fired = 0
+        lock = self._lock
+        while True:
+            with lock:
+                if self._tick >= target:
+                    break
+                if not self._count:
+                    # nothing scheduled, no need to step through the empty slots
+                    self._tick = target
+                    break
+                self._tick += 1
+                tick = self._tick
+                for level in range(1, len(self._wheels)):
+                    if tick % self._spans[level]:
+                        break
+                    self._cascade(self._wheels[level][(tick // self._spans[level]) % self.size])
+                else:
+                    if tick % self._spans[-1] == 0:
+                        self._cascade(self._overflow)
+                bucket = self._wheels[0][tick % self.size]
+
+            # one timer at a time, a callback may cancel the others of the tick
+            while True:
+                with lock:
+                    if not bucket:
+                        break
+                    timer = bucket.pop()
+                    timer.bucket = None
+                    self._count -= 1
+                fired += 1
+                timer.callback()
+        return fired
+
+    def _cascade(self, bucket: Set[Timer]):
+        timers = list(bucket)
+        bucket.clear()
+        for timer in timers:
+            self._place(timer)
+
+    def run(self, stop: threading.Event):
+        """Advances the wheel every tick until stop is set, e.g. in a background thread."""
+        while not stop.wait(self.resolution):
+            self.advance()
+
+
+class AsyncTimingWheel(TimingWheel):
+    """A timing wheel driven by a task on the asyncio event loop."""
+
+    async def run(self):
+        """Advances the wheel every tick until the task is cancelled."""
+        while True:
+            await asyncio.sleep(self.resolution)
+            self.advance()
+
+
+def _process(machine: StateMachine, event: Event):
+    machine.process(event)
+
+
+class StateTimeouts:
+    """State timeouts and state-scoped scheduled events for machines sharing one wheel.
+
+    A state with a ``timeout`` (seconds) makes the machine process ``Event(event)`` if it is
+    still in that state after the timeout. With ``restart`` the timeout counts from the last
+    event the machine processed in the state, otherwise from entering it. Events scheduled with
+    ``schedule`` belong to the current state as well; all timers of a state are cancelled when
+    the machine leaves it.
+
+    Due events are handed to ``deliver(machine, event)`` on the thread driving the wheel. The
+    default calls ``machine.process``, which is only safe if nothing else processes events of
+    the machine meanwhile, e.g. with ``AsyncTimingWheel`` on the machine's event loop. With a
+    wheel driven by a thread, deliver through the machine's consumer instead, such as
+    ``lambda machine, event: actors[machine].send(event)`` for ``MachineActor``. Such an event
+    is processed later and may find the machine in another state already."""
+
+    def __init__(
+        self,
+        wheel: TimingWheel,
+        event: str = "timeout",
+        restart: bool = True,
+        deliver: Callable[[StateMachine, Event], None] = _process,
+    ):
+        self.wheel = wheel
+        self.event = event
+        self.restart = restart
+        self.deliver = deliver
+        # pending timers per machine, fired timers remove themselves
+        self._timers: Dict[StateMachine, Set[Timer]] = {}
+        # the timer of the current state's timeout per machine
+        self._timeouts: Dict[StateMachine, Optional[Timer]] = {}
+        self._hooks: Dict[StateMachine, List[tuple]] = {}
+        # guards the timers above, changed by hooks and by firing timers on the wheel's thread
+        self._lock = threading.Lock()
+
+    def attach(self, machine: StateMachine):
+        """Starts managing the timers of a machine, arming the timeout of its current state."""
+
+        def on_exit(state: State, event: Event):
+            self._cancel(machine)
+
+        def on_enter(state: State, event: Event):
+            self._arm(machine, state)
+
+        def on_transition(source: State, event: Event, target: State):
+            if target is source:
+                with self._lock:
+                    timeout = self._timeouts[machine]
+                    if timeout is None:
+                        return
+                    self.wheel.cancel(timeout)
+                    self._timers[machine].discard(timeout)
+                self._arm(machine, target)
+
+        with self._lock:
+            self._timers[machine] = set()
+            self._timeouts[machine] = None
+        self._hooks[machine] = [("on_exit", on_exit), ("on_enter", on_enter)]
+        if self.restart:
+            self._hooks[machine].append(("on_transition", on_transition))
+        for kind, callback in self._hooks[machine]:
+            machine.add_hook(kind, callback)
+        if machine.current_state is not None:
+            self._arm(machine, machine.current_state)
+
+    def detach(self, machine: StateMachine):
+        """Cancels the timers of a machine and stops managing it."""
+        self._cancel(machine)
+        for kind, callback in self._hooks.pop(machine):
+            machine.remove_hook(kind, callback)
+        with self._lock:
+            del self._timers[machine]
+            del self._timeouts[machine]
+
+    def schedule(self, machine: StateMachine, delay: float, event: Event) -> Timer:
+        """Processes event after delay unless the machine left its current state before."""
+        with self._lock:
+            return self._schedule(machine, delay, event)
+
+    def _schedule(self, machine: StateMachine, delay: float, event: Event) -> Timer:
+        timers = self._timers[machine]
+
+        def fire():
+            with self._lock:
+                if timer not in timers:
+                    # cancelled while the wheel was firing it
+                    return
+                timers.discard(timer)
+            self.deliver(machine, event)
+
+        timer = self.wheel.schedule(delay, fire)
+        timers.add(timer)
+        return timer
+
+    def pending(self, machine: StateMachine) -> int:
+        """Number of timers of the machine that have not fired yet."""
+        return len(self._timers[machine])
+
+    def _arm(self, machine: StateMachine, state: State):
+        timeout = getattr(state, "timeout", None)
+        with self._lock:
+            self._timeouts[machine] = (
+                None if timeout is None else self._schedule(machine, timeout, Event(self.event))
+            )
+
+    def _cancel(self, machine: StateMachine):
+        with self._lock:
+            timers = self._timers[machine]
+            for timer in timers:
+                self.wheel.cancel(timer)
+            timers.clear()
+            self._timeouts[machine] = None
@@ -0,0 +1,104 @@
+"""Recording the most recent transitions of a machine and replaying them."""
+
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .statemachine import Event, State, StateMachine
+
+Transition = Tuple[float, int, Union[int, str], int]
+
+# recorded as target when the machine stopped, i.e. State.process returned None
+NO_STATE = -1
+
+
+class TraceRecorder:
+    """Keeps the last ``capacity`` transitions of a machine in preallocated arrays.
+
+    Each entry is (timestamp, source state id, event id, target state id), state ids being
+    indices into ``machine.states``; the target is NO_STATE if the event stopped the machine.
+    The cargo of events is not recorded."""
+
+    def __init__(self, capacity: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.sources = array("i", bytes(4 * capacity))
+        self.events = array("i", bytes(4 * capacity))
+        self.targets = array("i", bytes(4 * capacity))
+        self.count = 0
+        self._machine: Optional[StateMachine] = None
+        self._state_ids: Dict[State, int] = {}
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def attach(self, machine: StateMachine):
+        """Starts recording every event the machine processes."""
+        self._machine = machine
+        self._state_ids = {state: i for i, state in enumerate(machine.states)}
+        machine.add_hook("on_transition", self._on_transition)
+
+    def detach(self):
+        """Stops recording."""
+        if self._machine is not None:
+            self._machine.remove_hook("on_transition", self._on_transition)
+            self._machine = None
+
+    def _on_transition(self, source: State, event: Event, target: Optional[State]):
+        state_ids = self._state_ids
+        if source not in state_ids or (target is not None and target not in state_ids):
+            # states were added after attaching
+            state_ids = self._state_ids = {state: i for i, state in enumerate(self._machine.states)}
+        self.record(
+            self.clock(), state_ids[source], event.id, NO_STATE if target is None else state_ids[target]
+        )
+
+    def record(self, timestamp: float, source: int, event: int, target: int):
+        """Stores one transition, overwriting the oldest one when the buffer is full."""
+        index = self.count % self.capacity
+        self.timestamps[index] = timestamp
+        self.sources[index] = source
+        self.events[index] = event
+        self.targets[index] = target
+        self.count += 1
+
+    def records(self, names: bool = False) -> List[Transition]:
+        """Returns the recorded transitions, oldest first. With ``names`` the event ids are
+        replaced by event names, which stay valid in other processes."""
+        start = self.count - len(self)
+        result = []
+        for position in range(start, self.count):
+            index = position % self.capacity
+            event = self.events[index]
+            result.append(
+                (
+                    self.timestamps[index],
+                    self.sources[index],
+                    Event.name_of(event) if names else event,
+                    self.targets[index],
+                )
+            )
+        return result
+
+    def clear(self):
+        """Forgets all recorded transitions."""
+        self.count = 0
+
+
+def replay(trace: Sequence[Transition], machine: StateMachine) -> Optional[int]:
+    """Feeds the events of a trace through a machine, starting in the first recorded state.
+
+    Returns the position of the first transition that ends in a different state than recorded,
+    or None if the machine followed the whole trace. A NO_STATE target expects the machine to
+    have stopped. Events are replayed without cargo."""
+    states = machine.states
+    for position, (_, source, event, target) in enumerate(trace):
+        if position == 0:
+            machine.current_state = states[source]
+        elif machine.current_state is not states[source]:
+            return position
+        machine.process(Event(event if isinstance(event, str) else Event.name_of(event)))
+        if machine.current_state is not (None if target == NO_STATE else states[target]):
+            return position
+    return None
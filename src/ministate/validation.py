@@ -0,0 +1,128 @@
+"""Checks of transitions tables before a machine processes any event."""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .event import Event
+from .statemachine import State
+from .table import Transition, event_name
+
+
+class ValidationReport:
+    """Findings of validate_transitions.
+
+    Unknown state keys, targets, parents and events are errors. Unreachable and dead-end states
+    are warnings: they are judged from the transitions table only, while ``State.process`` may
+    still switch states at run time."""
+
+    def __init__(self):
+        self.unknown_states: List[str] = []
+        self.unknown_targets: List[Tuple[str, str, str]] = []
+        self.unknown_parents: List[Tuple[str, str]] = []
+        self.unknown_events: List[Tuple[str, str]] = []
+        self.unreachable: List[str] = []
+        self.dead_ends: List[str] = []
+
+    @property
+    def errors(self) -> List[str]:
+        """Descriptions of all errors."""
+        return (
+            [f"transitions refer to unknown state {name!r}" for name in self.unknown_states]
+            + [
+                f"{state}/{event} leads to unknown state {target!r}"
+                for state, event, target in self.unknown_targets
+            ]
+            + [f"state {state!r} has unknown parent {parent!r}" for state, parent in self.unknown_parents]
+            + [f"{state} handles unknown event {event!r}" for state, event in self.unknown_events]
+        )
+
+    @property
+    def warnings(self) -> List[str]:
+        """Descriptions of all warnings."""
+        return [f"state {name!r} is unreachable" for name in self.unreachable] + [
+            f"state {name!r} is a dead end" for name in self.dead_ends
+        ]
+
+    @property
+    def ok(self) -> bool:
+        """True if there are no errors."""
+        return not self.errors
+
+    def __str__(self) -> str:
+        return "; ".join(self.errors + self.warnings) or "no findings"
+
+
+class ValidationError(ValueError):
+    """Raised when a transitions table has errors, the findings are in ``report``."""
+
+    def __init__(self, report: ValidationReport):
+        super().__init__(str(report))
+        self.report = report
+
+
+def _targets(target) -> List:
+    if isinstance(target, Transition):
+        return [target.target]
+    if isinstance(target, (list, tuple)):
+        return [transition.target for transition in target]
+    return [target]
+
+
+def validate_transitions(
+    states: List[State],
+    transitions: Dict,
+    initial: Optional[State] = None,
+    events: Optional[Iterable[str]] = None,
+) -> ValidationReport:
+    """Checks a transitions table against the states of a machine.
+
+    ``events`` are the known event names, by default those declared with ``Event.set_names``;
+    without any the event check is skipped. Reachability is checked from ``initial``."""
+    report = ValidationReport()
+    names = {state.name for state in states}
+    known_events: Set[str] = set(Event.declared() if events is None else events)
+
+    edges: Dict[str, Set[str]] = {name: set() for name in names}
+    for state_name, row in transitions.items():
+        if state_name not in names:
+            report.unknown_states.append(state_name)
+            continue
+        for event, target in row.items():
+            if known_events and event_name(event) not in known_events:
+                report.unknown_events.append((state_name, event_name(event)))
+            for next_state in _targets(target):
+                next_name = next_state if isinstance(next_state, str) else next_state.name
+                if next_name in names:
+                    edges[state_name].add(next_name)
+                else:
+                    report.unknown_targets.append((state_name, event_name(event), next_name))
+
+    parents: Dict[str, Optional[str]] = {}
+    for state in states:
+        parent = getattr(state, "parent", None)
+        parents[state.name] = None if parent is None else parent.name
+        if parent is not None and parent.name not in names:
+            report.unknown_parents.append((state.name, parent.name))
+    # states leave through the entries inherited from their ancestors as well
+    for name in names:
+        ancestor, seen = parents[name], {name}
+        while ancestor in edges and ancestor not in seen:
+            edges[name] |= edges[ancestor]
+            seen.add(ancestor)
+            ancestor = parents[ancestor]
+
+    if initial is not None and initial.name in names:
+        reached = {initial.name}
+        pending = deque([initial.name])
+        while pending:
+            for next_name in edges[pending.popleft()]:
+                if next_name not in reached:
+                    reached.add(next_name)
+                    pending.append(next_name)
+        report.unreachable = [state.name for state in states if state.name not in reached]
+
+    for state in states:
+        # a state with its own process can still decide to leave
+        if type(state).process is State.process and not edges[state.name] - {state.name}:
+            report.dead_ends.append(state.name)
+    return report
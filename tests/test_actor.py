@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ministate.actor import MachineActor
+from ministate.statemachine import State, StateMachine, Event
+
+
+class Counting(State):
+    def process(self, event: Event):
+        self.model.values.append(event.cargo)
+        return self
+
+
+def make_machine():
+    counting = Counting()
+    machine = StateMachine(states=[counting], current_state=counting)
+    machine.values = []
+    return machine
+
+
+def produce(actor, producer, count=200):
+    for i in range(count):
+        actor.send(Event("count", (producer, i)))
+
+
+def check_order(values, producers, count=200):
+    assert len(values) == producers * count
+    for producer in range(producers):
+        assert [i for p, i in values if p == producer] == list(range(count))
+
+
+def test_dedicated_thread():
+    actor = MachineActor(make_machine())
+    actor.start()
+    threads = [threading.Thread(target=produce, args=(actor, p)) for p in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    actor.stop()
+
+    check_order(actor.machine.values, 4)
+
+
+def test_shared_pool():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        actors = [MachineActor(make_machine(), executor=pool) for _ in range(3)]
+        threads = [threading.Thread(target=produce, args=(actor, p)) for actor in actors for p in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    for actor in actors:
+        check_order(actor.machine.values, 2)
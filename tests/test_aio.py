@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from ministate.aio import AsyncStateMachine
+from ministate.statemachine import State, Event
+
+
+class Idle(State):
+    def process(self, event: Event):
+        return self.model.Working if event.name == "work" else self
+
+
+class Working(State):
+    async def process(self, event: Event):
+        await asyncio.sleep(0)
+        self.model.done.append(event.cargo)
+        return self.model.Idle
+
+
+class Worker(AsyncStateMachine):
+    def __init__(self, **kwargs):
+        super().__init__(states=[Idle(), Working()], **kwargs)
+        self.current_state = self.Idle
+        self.done = []
+
+
+def test_async_process():
+    async def main():
+        worker = Worker()
+        runner = asyncio.create_task(worker.run())
+        for i in range(3):
+            await worker.dispatch(Event("work"))
+            await worker.dispatch(Event("job", i))
+        await worker.join()
+        runner.cancel()
+        return worker
+
+    worker = asyncio.run(main())
+    assert worker.done == [0, 1, 2]
+    assert worker.current_state is worker.Idle
+
+
+def test_backpressure():
+    async def main():
+        worker = Worker(maxsize=1)
+        worker.dispatch_nowait(Event("work"))
+        with pytest.raises(asyncio.QueueFull):
+            worker.dispatch_nowait(Event("job"))
+
+    asyncio.run(main())
+
+
+def test_compiled_table():
+    async def main():
+        worker = Worker(compiled=True)
+        worker.transitions = {"Idle": {"skip": worker.Idle}}
+        await worker.process(Event("skip"))
+        await worker.process(Event("work"))
+        return worker
+
+    assert asyncio.run(main()).current_state.name == "Working"
+
+
+def test_inherited_entry_points():
+    async def events():
+        for name in ["work", "job", "noop"]:
+            yield Event(name)
+
+    async def main():
+        worker = Worker()
+        transitions = [(source.name, target.name) async for source, _, target in worker.feed(events(), 2)]
+        assert transitions == [("Idle", "Working"), ("Working", "Idle"), ("Idle", "Idle")]
+
+        assert await worker.run_stream([Event("work"), Event("job")]) == 2
+        assert await worker.dispatch_many([Event("work"), Event("job", 7)]) == 2
+        assert await worker.run_until_idle() == 2
+        assert worker.done == [None, None, 7]
+        assert worker.current_state is worker.Idle
+
+    asyncio.run(main())
+
+
+def test_sync_wrappers_rejected():
+    worker = Worker()
+    with pytest.raises(TypeError):
+        worker.add_hook("on_transition", print)
+    with pytest.raises(TypeError):
+        worker.enable_metrics()
+    with pytest.raises(TypeError):
+        worker.enable_memo()
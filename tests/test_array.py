@@ -0,0 +1,93 @@
+import pytest
+
+from ministate.statemachine import State, Event
+
+np = pytest.importorskip("numpy")
+
+from ministate.array import MachineArray  # noqa: E402
+
+
+class Idle(State):
+    def process(self, event: Event):
+        return self
+
+
+class Counting(State):
+    def process(self, event: Event):
+        self.model["count"] += event.cargo
+        return self
+
+
+def make_array(size):
+    idle, counting = Idle(), Counting()
+    transitions = {
+        "Idle": {"start": counting},
+        "Counting": {"stop": idle},
+    }
+    models = [{"count": 0} for _ in range(size)]
+    array = MachineArray(size, [idle, counting], transitions, idle, models=models, events=["add"])
+    return array, models
+
+
+def test_vectorized_transitions():
+    array, _ = make_array(4)
+    start, stop = array.event_id("start"), array.event_id(Event("stop"))
+
+    array.process([0, 2, 3], [start, start, start])
+    assert array.state_ids.tolist() == [1, 0, 1, 1]
+
+    array.process([3], [stop])
+    assert array.current_state(3) is array.states[0]
+    assert len(array) == 4
+
+
+def test_fallback_and_ordering():
+    array, models = make_array(3)
+    start, stop, add = array.event_id("start"), array.event_id("stop"), array.event_id("add")
+
+    # instance 0 receives several events in one batch, they apply in order
+    array.process([0, 1, 0, 0, 0], [start, add, add, stop, add], cargo=[None, 5, 2, None, 7])
+
+    assert array.state_ids.tolist() == [0, 0, 0]
+    assert models[0]["count"] == 2
+    assert models[1]["count"] == 0
+
+
+def test_guards():
+    from ministate.table import Transition
+
+    idle, counting = Idle(), Counting()
+    transitions = {"Idle": {"start": Transition(counting, guard=lambda model, event: model["count"] >= 0)}}
+    models = [{"count": 0}, {"count": -1}]
+    array = MachineArray(2, [idle, counting], transitions, idle, models=models)
+
+    array.process([0, 1], [array.event_id("start")] * 2)
+    assert array.state_ids.tolist() == [1, 0]
+
+
+class Stopping(State):
+    def process(self, event: Event):
+        return None if event.name == "halt" else self
+
+
+def test_repeated_instances_and_stop():
+    idle, counting, stopping = Idle(), Counting(), Stopping()
+    transitions = {"Idle": {"start": counting, "wait": stopping}, "Counting": {"stop": idle}}
+    models = [{"count": 0} for _ in range(3)]
+    array = MachineArray(
+        3, [idle, counting, stopping], transitions, idle, models=models, events=["add", "halt"]
+    )
+    start, stop, add, wait, halt = (array.event_id(name) for name in ["start", "stop", "add", "wait", "halt"])
+
+    rows = 20_000
+    array.process(
+        [1] * rows + [2, 2, 2, 0],
+        [start] + [add] * (rows - 1) + [wait, halt, start, add],
+        cargo=[1] * (rows + 4),
+    )
+    assert models[1]["count"] == rows - 1
+    assert models[0]["count"] == 0
+    assert array.current_state(2) is None
+    assert array.current_state(0) is idle
+    # models are only lent to the shared states while they process
+    assert counting.model is None
@@ -0,0 +1,111 @@
+import os
+import random
+
+import pytest
+
+from ministate.codegen import cache_key, compile_process, generate_source
+from ministate.definition import MachineDefinition
+from ministate.statemachine import State, StateMachine, Event
+from ministate.table import Transition
+
+
+class Node(State):
+    def __init__(self, name, parent=None):
+        super().__init__(parent)
+        self.name = name
+
+    def process(self, event: Event):
+        # deterministic fallback so the engines can be compared
+        if event.name == "jump":
+            return self.model.states[(self.model.states.index(self) + 3) % len(self.model.states)]
+        return self
+
+
+class Model:
+    def __init__(self):
+        self.flag = False
+
+
+def toggle(model, event):
+    model.flag = not model.flag
+
+
+def random_definition(rng, count):
+    states = [Node(f"S{i}") for i in range(count)]
+    for state in states[1:]:
+        if rng.random() < 0.3:
+            state.parent = rng.choice(states[: states.index(state)])
+    events = [f"codegen_e{i}" for i in range(12)]
+    transitions = {}
+    for state in states:
+        row = {}
+        for event in rng.sample(events, rng.randrange(len(events))):
+            target = rng.choice(states)
+            if rng.random() < 0.2:
+                target = [
+                    Transition(target, guard=lambda model, event: model.flag, action=toggle),
+                    Transition(states[0]),
+                ]
+            row[event] = target
+        transitions[state.name] = row
+    return MachineDefinition(states, transitions), events + ["jump", "codegen_unknown"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_differential(seed):
+    rng = random.Random(seed)
+    definition, events = random_definition(rng, rng.choice([3, 9, 20]))
+    generic = definition.create(Model(), definition.states[0])
+    definition.specialize()
+    specialized = definition.create(Model(), definition.states[0])
+    assert type(specialized).__name__ == "SpecializedMachine"
+
+    for _ in range(2000):
+        event = Event(rng.choice(events))
+        generic.model.states = specialized.model.states = definition.states
+        generic.process(event)
+        specialized.process(event)
+        assert specialized.state_id == generic.state_id
+        assert specialized.model.flag == generic.model.flag
+
+
+def test_matches_state_machine():
+    definition, events = random_definition(random.Random(7), 6)
+    process = compile_process(definition.table)
+    machine = StateMachine(states=definition.states, transitions={}, compiled=True)
+    machine._table = definition.table
+    machine.current_state = definition.states[0]
+    machine.flag = False
+    specialized = definition.create(machine, definition.states[0])
+    rng = random.Random(8)
+    for _ in range(500):
+        event = Event(rng.choice(events))
+        process(specialized, event)
+        machine.process(event)
+        assert definition.states[specialized.state_id] is machine.current_state
+
+
+def test_no_state():
+    definition, _ = random_definition(random.Random(1), 3)
+    definition.specialize()
+    machine = definition.create()
+    machine.process(Event("codegen_e1"))
+    assert machine.current_state is None
+
+
+def test_disk_cache(tmp_path):
+    definition, events = random_definition(random.Random(3), 5)
+    key = cache_key(definition.table)
+    compile_process(definition.table, str(tmp_path))
+    with open(tmp_path / (key + ".py")) as file:
+        assert file.read() == generate_source(definition.table)
+
+    # a cached code object is used as is
+    code_path = tmp_path / (key + ".code")
+    os.remove(tmp_path / (key + ".py"))
+    definition.specialize(str(tmp_path))
+    assert not os.path.exists(tmp_path / (key + ".py"))
+
+    code_path.write_bytes(b"corrupt")
+    compile_process(definition.table, str(tmp_path))
+    assert os.path.exists(tmp_path / (key + ".py"))
@@ -0,0 +1,105 @@
+import pytest
+
+from ministate.statemachine import State, StateMachine, Event
+from ministate.table import NO_TRANSITION, TransitionTable
+
+
+class Idle(State):
+    def process(self, event: Event):
+        return self
+
+
+class Running(State):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def process(self, event: Event):
+        self.calls += 1
+        return self
+
+
+def make_machine():
+    idle, running = Idle(), Running()
+    transitions = {
+        "Idle": {"start": running},
+        "Running": {Event("stop"): idle},
+    }
+    return StateMachine(states=[idle, running], transitions=transitions, current_state=idle, compiled=True)
+
+
+def test_table_layout():
+    machine = make_machine()
+    table = machine.compile()
+
+    assert table.state_ids == {"Idle": 0, "Running": 1}
+    assert table.rows[0][Event("start").id] == 1
+    assert table.rows[1][Event("stop").id] == 0
+    assert table.lookup(0, "stop") == NO_TRANSITION
+    assert table.lookup(0, Event("unknown")) == NO_TRANSITION
+
+
+def test_compiled_dispatch():
+    machine = make_machine()
+
+    machine.process(Event("start"))
+    assert machine.current_state is machine.Running
+
+    # not in the table, handled by Running.process
+    machine.process(Event("tick"))
+    assert machine.current_state is machine.Running
+    assert machine.Running.calls == 1
+
+    machine.process(Event("stop"))
+    assert machine.current_state is machine.Idle
+    assert machine.Running.calls == 1
+
+
+def test_recompile_on_change():
+    machine = make_machine()
+    machine.process(Event("start"))
+    table = machine._table
+
+    class Paused(State):
+        def process(self, event: Event):
+            return self
+
+    machine.add_state(Paused())
+    assert machine._table is None
+
+    machine.transitions = {**machine.transitions, "Running": {"pause": machine.Paused}}
+    machine.process(Event("pause"))
+    assert machine.current_state is machine.Paused
+    assert machine._table is not table
+
+
+def test_unknown_target():
+    idle = Idle()
+    with pytest.raises(ValueError):
+        TransitionTable([idle], {"Idle": {"start": Running()}})
+    with pytest.raises(ValueError):
+        TransitionTable([idle], {"Missing": {"start": idle}})
+
+
+@pytest.mark.parametrize("metrics", [False, True])
+def test_state_outside_machine(metrics):
+    class Detour(State):
+        def process(self, event: Event):
+            return self.model.Idle
+
+    class Leaving(State):
+        def process(self, event: Event):
+            detour = Detour()
+            detour.model = self.model
+            return detour
+
+    leaving = Leaving()
+    machine = StateMachine(states=[leaving, Idle()], transitions={"Idle": {"go": leaving}}, compiled=True)
+    if metrics:
+        machine.enable_metrics()
+    machine.current_state = machine.Idle
+    machine.process(Event("go"))
+    machine.process(Event("away"))
+    assert type(machine.current_state).__name__ == "Detour"
+    machine.process(Event("back"))
+    assert machine.current_state is machine.Idle
@@ -0,0 +1,78 @@
+import sys
+
+from ministate.definition import NO_STATE, Machine, MachineDefinition
+from ministate.snapshot import dump_state, load_state
+from ministate.statemachine import State, Event
+
+
+class Idle(State):
+    def process(self, event: Event):
+        return self
+
+
+class Counting(State):
+    def process(self, event: Event):
+        self.model.count += 1
+        return self
+
+
+class Session:
+    def __init__(self):
+        self.count = 0
+
+
+def make_definition():
+    idle, counting = Idle(), Counting()
+    return MachineDefinition([idle, counting], {"Idle": {"start": counting}, "Counting": {"stop": idle}})
+
+
+def test_shared_definition():
+    definition = make_definition()
+    first, second = Session(), Session()
+    machines = [definition.create(first, "Idle"), definition.create(second, definition.states[0])]
+
+    for machine in machines:
+        machine.process(Event("start"))
+    machines[0].process(Event("tick"))
+    machines[0].process(Event("tick"))
+    machines[1].process(Event("tick"))
+    machines[1].process(Event("stop"))
+
+    assert (first.count, second.count) == (2, 1)
+    assert machines[0].current_state.name == "Counting"
+    assert machines[1].current_state is definition.states[0]
+
+
+def test_compact_instances():
+    definition = make_definition()
+    machine = definition.create()
+    assert machine.state_id == NO_STATE
+    machine.process(Event("start"))
+    assert machine.current_state is None
+
+    assert not hasattr(machine, "__dict__")
+    assert sys.getsizeof(machine) <= 64
+
+    machine.current_state = "Counting"
+    restored = Machine(definition)
+    load_state(restored, dump_state(machine))
+    assert restored.state_id == 1
+
+
+def test_process_returns_name_or_none():
+    class Stopping(State):
+        def process(self, event: Event):
+            return None if event.name == "quit" else "Idle"
+
+    stopping = Stopping()
+    definition = MachineDefinition([Idle(), stopping], {"Idle": {"start": stopping}})
+    machine = definition.create(state="Idle")
+    machine.process(Event("start"))
+    machine.process(Event("tick"))
+    assert machine.current_state.name == "Idle"
+
+    machine.process(Event("start"))
+    machine.process(Event("quit"))
+    assert machine.state_id == NO_STATE
+    machine.process(Event("start"))
+    assert machine.current_state is None
@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from ministate.durable import LOG_FILE, DurableMachine, read_log
+from ministate.statemachine import State, StateMachine, Event
+
+
+class Off(State):
+    def process(self, event: Event):
+        return self.model.On if event.name == "toggle" else self
+
+
+class On(State):
+    def process(self, event: Event):
+        if event.name == "add":
+            self.model.total += event.cargo
+        return self.model.Off if event.name == "toggle" else self
+
+
+def make_machine():
+    machine = StateMachine(states=[Off(), On()])
+    machine.current_state = machine.Off
+    machine.total = 0
+    return machine
+
+
+def test_group_commit_and_recovery(tmp_path):
+    directory = str(tmp_path)
+    durable = DurableMachine(make_machine(), directory, group_size=3)
+    for event in [Event("toggle"), Event("add", 2), Event("add", 3), Event("add", 4)]:
+        durable.process(event)
+
+    # only the first group has been written
+    assert [sequence for sequence, _ in read_log(directory)] == [1, 2, 3]
+    durable.close()
+    assert read_log(directory)[-1][1].cargo == 4
+
+    restored = DurableMachine(make_machine(), directory)
+    assert restored.current_state.name == "On"
+    assert restored.machine.total == 9
+    assert restored.sequence == 4
+    restored.close()
+
+
+def dump_total(model) -> bytes:
+    return str(model.total).encode()
+
+
+def load_total(model, data: bytes):
+    model.total = int(data)
+
+
+def test_snapshot_and_compaction(tmp_path):
+    directory = str(tmp_path)
+    models = dict(dump_model=dump_total, load_model=load_total)
+    durable = DurableMachine(make_machine(), directory, group_size=100, snapshot_every=3, **models)
+    for event in [Event("toggle"), Event("add", 5), Event("add", 7), Event("toggle")]:
+        durable.process(event)
+    assert [sequence for sequence, _ in read_log(directory)] == []
+    durable.close()
+
+    assert [sequence for sequence, _ in read_log(directory)] == [4]
+    restored = DurableMachine(make_machine(), directory, **models)
+    assert restored.current_state.name == "Off"
+    assert restored.machine.total == 12
+    assert restored.sequence == 4
+    restored.close()
+
+    with pytest.raises(ValueError):
+        DurableMachine(make_machine(), directory)
+
+
+def test_no_compaction_without_model_functions(tmp_path):
+    directory = str(tmp_path)
+    with DurableMachine(make_machine(), directory, snapshot_every=2) as durable:
+        for event in [Event("toggle"), Event("add", 5), Event("add", 7)]:
+            durable.process(event)
+        durable.snapshot()
+    assert [sequence for sequence, _ in read_log(directory)] == [1, 2, 3]
+    assert DurableMachine(make_machine(), directory).machine.total == 12
+
+
+def test_failed_event_not_logged(tmp_path):
+    directory = str(tmp_path)
+    with DurableMachine(make_machine(), directory) as durable:
+        durable.process(Event("toggle"))
+        with pytest.raises(TypeError):
+            durable.process(Event("add"))
+        durable.process(Event("add", 2))
+    assert [sequence for sequence, _ in read_log(directory)] == [1, 2]
+
+    restored = DurableMachine(make_machine(), directory)
+    assert restored.machine.total == 2
+    restored.close()
+
+
+def test_torn_record(tmp_path):
+    directory = str(tmp_path)
+    with DurableMachine(make_machine(), directory) as durable:
+        durable.process(Event("toggle"))
+    with open(os.path.join(directory, LOG_FILE), "ab") as file:
+        file.write(b"\x01\x02\x03")
+
+    restored = DurableMachine(make_machine(), directory)
+    assert restored.current_state.name == "On"
+    restored.process(Event("toggle"))
+    restored.close()
+    assert [sequence for sequence, _ in read_log(directory)] == [1, 2]
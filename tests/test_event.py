@@ -0,0 +1,72 @@
+import pickle
+
+import pytest
+
+from ministate.statemachine import Event
+
+
+def test_interning():
+    start = Event("start")
+
+    assert Event("start") is start
+    assert Event.intern("start") == start.id
+    assert Event.name_of(start.id) == "start"
+
+    with_cargo = Event("start", 42)
+    assert with_cargo is not start
+    assert with_cargo == start
+    assert hash(with_cargo) == hash(start)
+    assert with_cargo != Event("stop")
+    assert {start: 1}[with_cargo] == 1
+
+
+def test_slots_and_pickle():
+    event = Event("message", "payload")
+    with pytest.raises(AttributeError):
+        event.other = 1
+
+    restored = pickle.loads(pickle.dumps(event))
+    assert restored == event
+    assert restored.cargo == "payload"
+    assert pickle.loads(pickle.dumps(Event("message"))) is Event("message")
+
+
+def test_set_names():
+    Event.set_names(["relax"])
+    assert Event.relax is Event("relax")
+
+    with pytest.raises(ValueError):
+        Event.set_names(["cargo"])
+
+
+def test_shared_events_are_read_only():
+    shared = Event("read_only")
+    with pytest.raises(AttributeError):
+        shared.cargo = "changed"
+    assert Event("read_only").cargo is None
+    assert isinstance(shared, Event)
+
+    own = Event("read_only", 1)
+    own.cargo = 2
+    assert own.cargo == 2
+
+
+def test_subclass_with_own_arguments():
+    class Prioritized(Event):
+        __slots__ = ("priority",)
+
+        def __init__(self, name, cargo=None, priority=0):
+            super().__init__(name, cargo)
+            self.priority = priority
+
+    event = Prioritized("alarm", priority=2)
+    assert event.priority == 2
+    assert event == Event("alarm")
+    assert Prioritized("alarm", "x").cargo == "x"
+
+
+def test_name_limit(monkeypatch):
+    monkeypatch.setattr(Event, "max_names", Event.count())
+    with pytest.raises(ValueError):
+        Event("limit_never_registered_before")
+    assert Event("start").name == "start"
@@ -0,0 +1,71 @@
+from ministate.definition import MachineDefinition
+from ministate.statemachine import State, StateMachine
+from ministate.table import Transition
+
+
+class Idle(State):
+    pass
+
+
+class Connecting(State):
+    pass
+
+
+class Online(State):
+    pass
+
+
+class Failed(State):
+    pass
+
+
+class Retired(State):
+    pass
+
+
+def make_machine():
+    transitions = {
+        "Idle": {"connect": "Connecting"},
+        "Connecting": {"ok": "Online", "error": Transition("Failed", guard=lambda m, e: True)},
+        "Online": {"drop": "Connecting", "retire": "Retired"},
+        "Failed": {"reset": "Idle"},
+    }
+    machine = StateMachine(states=[Idle(), Connecting(), Online(), Failed(), Retired()], compiled=True)
+    machine.transitions = transitions
+    return machine
+
+
+def test_paths_and_reachability():
+    graph = make_machine().graph
+
+    assert graph.shortest_path("Online", "Idle") == ["drop", "error", "reset"]
+    assert graph.shortest_path("Idle", "Idle") == []
+    assert graph.shortest_path("Retired", "Idle") is None
+    assert graph.reachable("Retired") == {4}
+    assert graph.reachable(0) == {0, 1, 2, 3, 4}
+
+    # memoized, and callers cannot modify the cached path
+    graph.shortest_path("Online", "Idle").append("x")
+    assert graph.shortest_path("Online", "Idle") == ["drop", "error", "reset"]
+
+
+def test_components():
+    components = make_machine().graph.components()
+    assert frozenset({"Idle", "Connecting", "Online", "Failed"}) in components
+    assert frozenset({"Retired"}) in components
+    assert len(components) == 2
+
+
+def test_invalidation():
+    machine = make_machine()
+    assert machine.graph.shortest_path("Retired", "Idle") is None
+
+    machine.transitions = {**machine.transitions, "Retired": {"revive": "Idle"}}
+    assert machine.graph.shortest_path("Retired", "Idle") == ["revive"]
+    assert len(machine.graph.components()) == 1
+
+
+def test_definition_graph():
+    idle, online = Idle(), Online()
+    definition = MachineDefinition([idle, online], {"Idle": {"up": online}})
+    assert definition.graph.shortest_path(idle, online) == ["up"]
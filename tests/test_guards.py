@@ -0,0 +1,76 @@
+from ministate import State, StateMachine, Event, Transition
+from ministate.definition import MachineDefinition
+from ministate.table import GUARDED, TransitionTable
+
+
+class Idle(State):
+    pass
+
+
+class Running(State):
+    pass
+
+
+class Mouse:
+    def __init__(self, breath=3):
+        self.breath = breath
+        self.position = 0
+
+    def run_ahead(self, event):
+        self.breath -= 1
+        self.position += 1
+
+    def recover(self, event):
+        self.breath += 2
+
+
+def has_breath(model, event):
+    return model.breath > 0
+
+
+def make_transitions():
+    return {
+        "Idle": {"start": [Transition("Running", guard=has_breath), Transition("Idle")], "tick": "Idle"},
+        "Running": {
+            "start": [Transition("Running", has_breath, Mouse.run_ahead), Transition("Idle")],
+            "relax": Transition("Idle", action=Mouse.recover),
+        },
+    }
+
+
+def test_table_entries():
+    table = TransitionTable([Idle(), Running()], make_transitions())
+    assert table.lookup(0, "start") == GUARDED
+    assert table.lookup(0, "tick") == 0
+    # a plain Transition without guard or action compiles to a plain entry
+    assert TransitionTable([Idle()], {"Idle": {"x": Transition("Idle")}}).lookup(0, "x") == 0
+
+
+def test_guarded_machine():
+    mouse = Mouse(breath=2)
+    machine = StateMachine(
+        model=mouse, states=[Idle(), Running()], transitions=make_transitions(), compiled=True
+    )
+    machine.current_state = machine.Idle
+
+    for _ in range(4):
+        machine.process(Event("start"))
+    # entered Running, ran twice, then out of breath
+    assert mouse.position == 2
+    assert machine.current_state is machine.Idle
+
+    machine.process(Event("start"))
+    assert machine.current_state is machine.Idle
+
+    mouse.breath = 1
+    machine.process(Event("start"))
+    machine.process(Event("relax"))
+    assert (machine.current_state, mouse.breath) == (machine.Idle, 3)
+
+
+def test_guarded_definition():
+    definition = MachineDefinition([Idle(), Running()], make_transitions())
+    tired, fresh = definition.create(Mouse(breath=0), "Idle"), definition.create(Mouse(), "Idle")
+    for machine in (tired, fresh):
+        machine.process(Event("start"))
+    assert (tired.current_state.name, fresh.current_state.name) == ("Idle", "Running")
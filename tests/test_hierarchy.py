@@ -0,0 +1,67 @@
+import pytest
+
+from ministate.statemachine import State, StateMachine, Event
+from ministate.table import TransitionTable
+
+
+class Plain(State):
+    def process(self, event: Event):
+        return self
+
+
+class Active(Plain):
+    pass
+
+
+class Idle(Plain):
+    pass
+
+
+class Receiving(Plain):
+    pass
+
+
+class Stopped(Plain):
+    pass
+
+
+def make_machine():
+    active = Active()
+    idle, receiving = Idle(parent=active), Receiving(parent=active)
+    stopped = Stopped()
+    transitions = {
+        "Active": {"stop": stopped, "reset": idle},
+        "Idle": {"start": receiving},
+        # overrides the parent's entry
+        "Receiving": {"reset": receiving},
+    }
+    return StateMachine(
+        states=[active, idle, receiving, stopped], transitions=transitions, current_state=idle, compiled=True
+    )
+
+
+def test_bubbling():
+    machine = make_machine()
+
+    machine.process(Event("start"))
+    assert machine.current_state is machine.Receiving
+    machine.process(Event("reset"))
+    assert machine.current_state is machine.Receiving
+    machine.process(Event("stop"))
+    assert machine.current_state is machine.Stopped
+
+    machine.current_state = machine.Idle
+    machine.process(Event("stop"))
+    assert machine.current_state is machine.Stopped
+
+
+def test_nested_levels_and_cycles():
+    root, middle = Active(), Idle()
+    middle.parent = root
+    leaf = Receiving(parent=middle)
+    table = TransitionTable([root, middle, leaf], {"Active": {"stop": middle}})
+    assert table.lookup(2, "stop") == 1
+
+    root.parent = leaf
+    with pytest.raises(ValueError):
+        TransitionTable([root, middle, leaf], {})
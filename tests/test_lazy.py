@@ -0,0 +1,72 @@
+from ministate.definition import LazyMachine, MachineDefinition
+from ministate.statemachine import State, Event
+
+created = []
+
+
+class Tracked(State):
+    def __init__(self):
+        super().__init__()
+        created.append(self.name)
+        self.visits = 0
+
+
+class Idle(Tracked):
+    def process(self, event: Event):
+        self.visits += 1
+        return self.model.Busy if event.name == "work" else self
+
+
+class Busy(Tracked):
+    def process(self, event: Event):
+        self.visits += 1
+        return "Idle" if event.name == "rest" else self
+
+
+class Shared(State):
+    pass
+
+
+def make_definition():
+    unused = [type(f"Unused{i}", (Tracked,), {}) for i in range(30)]
+    return MachineDefinition(
+        [Idle, Busy, Shared()] + unused,
+        {"Idle": {"share": "Shared"}, "Shared": {"back": "Idle"}, "Unused0": {"lazy_go": "Unused1"}},
+    )
+
+
+def test_states_created_on_first_use():
+    definition = make_definition()
+    assert created == []
+    machines = [definition.create(state="Idle") for _ in range(3)]
+    assert isinstance(machines[0], LazyMachine)
+
+    machines[0].process(Event("work"))
+    machines[0].process(Event("rest"))
+    machines[0].process(Event("noop"))
+    assert created == ["Idle", "Busy"]
+    assert machines[0].current_state.visits == 2
+    assert machines[0].current_state is machines[0].Idle
+    assert machines[0].Busy.model is machines[0]
+
+    machines[1].process(Event("share"))
+    assert machines[1].current_state is definition.states[2]
+    machines[1].process(Event("back"))
+    assert created == ["Idle", "Busy"]
+
+    machines[2].current_state = "Unused0"
+    machines[2].process(Event("lazy_go"))
+    assert machines[2].state_id == definition.state_id("Unused1")
+    assert created == ["Idle", "Busy"]
+
+
+def test_specialized_lazy_machine():
+    created.clear()
+    definition = make_definition()
+    definition.specialize()
+    machine = definition.create(state="Idle")
+    assert isinstance(machine, LazyMachine)
+    machine.process(Event("work"))
+    machine.process(Event("rest"))
+    assert machine.current_state is machine.Idle
+    assert created == ["Idle", "Busy"]
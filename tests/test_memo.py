@@ -0,0 +1,75 @@
+from ministate.memo import TransitionMemo, pure
+from ministate.statemachine import State, StateMachine, Event
+
+
+class Idle(State):
+    calls = 0
+
+    @pure(key=lambda cargo: cargo["kind"])
+    def process(self, event: Event):
+        Idle.calls += 1
+        if event.name == "message" and event.cargo["kind"] == "start":
+            return self.model.Busy
+        return self
+
+
+class Busy(State):
+    calls = 0
+
+    @pure
+    def process(self, event: Event):
+        Busy.calls += 1
+        return self.model.Idle if event.name == "done" else self
+
+
+class Logging(State):
+    def process(self, event: Event):
+        self.model.log.append(event.name)
+        return self.model.Idle
+
+
+def make_machine():
+    machine = StateMachine(states=[Idle(), Busy(), Logging()])
+    machine.current_state = machine.Idle
+    machine.log = []
+    Idle.calls = Busy.calls = 0
+    return machine
+
+
+def test_memoized_transitions():
+    machine = make_machine()
+    memo = machine.enable_memo()
+    for i in range(100):
+        machine.process(Event("message", {"kind": "noop", "seq": i}))
+        machine.process(Event("message", {"kind": "start", "seq": i}))
+        machine.process(Event("done"))
+
+    assert machine.current_state is machine.Idle
+    assert (Idle.calls, Busy.calls) == (2, 1)
+    assert (memo.hits, memo.misses) == (297, 3)
+
+
+def test_impure_states_always_run():
+    machine = make_machine()
+    memo = machine.enable_memo()
+    machine.current_state = machine.Logging
+    machine.process(Event("a"))
+    machine.current_state = machine.Logging
+    machine.process(Event("a"))
+    assert machine.log == ["a", "a"]
+    assert len(memo) == 0
+
+
+def test_bounded_and_disabled():
+    machine = make_machine()
+    memo = machine.enable_memo(TransitionMemo(maxsize=2))
+    for kind in ["x", "y", "z", "x"]:
+        machine.process(Event("message", {"kind": kind}))
+    assert len(memo) == 2
+    assert memo.misses == 4
+
+    machine.disable_memo()
+    machine.process(Event("message", {"kind": "z"}))
+    assert Idle.calls == 5
+    memo.clear()
+    assert (len(memo), memo.hits, memo.misses) == (0, 0, 0)
@@ -39,7 +39,7 @@ class MessageProcessor:
         self.machine.add_state(receiving)
         self.machine.transitions = {
             "Idle": {"start_receiving": receiving},
-            "Processing": {"stop_processing": idle},
+            "Receiving": {"stop_processing": idle},
         }
         self.machine.current_state = idle
 
@@ -0,0 +1,143 @@
+import pytest
+
+from ministate.metrics import TransitionMetrics
+from ministate.statemachine import State, StateMachine, Event
+
+
+class Idle(State):
+    def process(self, event: Event):
+        return self.model.Running if event.name == "start" else self
+
+
+class Running(State):
+    def process(self, event: Event):
+        return self.model.Idle if event.name == "stop" else self
+
+
+class Paused(State):
+    pass
+
+
+def make_machine():
+    machine = StateMachine(states=[Idle(), Running()])
+    machine.current_state = machine.Idle
+    return machine
+
+
+def test_hooks():
+    machine = make_machine()
+    calls = []
+    on_enter = lambda state, event: calls.append(("enter", state.name))  # noqa: E731
+    machine.add_hook("on_exit", lambda state, event: calls.append(("exit", state.name)))
+    machine.add_hook("on_enter", on_enter)
+    machine.add_hook("on_transition", lambda s, e, t: calls.append((s.name, e.name, t.name)))
+
+    machine.process(Event("start"))
+    machine.process(Event("tick"))
+    assert calls == [
+        ("exit", "Idle"),
+        ("enter", "Running"),
+        ("Idle", "start", "Running"),
+        ("Running", "tick", "Running"),
+    ]
+
+    with pytest.raises(ValueError):
+        machine.add_hook("on_error", on_enter)
+
+
+def test_uninstrumented_by_default():
+    machine = make_machine()
+    assert "process" not in vars(machine)
+
+    machine.enable_metrics()
+    assert "process" in vars(machine)
+    machine.disable_metrics()
+    assert "process" not in vars(machine)
+
+
+def test_metrics():
+    machine = make_machine()
+    metrics = machine.enable_metrics(TransitionMetrics(sample_every=1))
+    for name in ["start", "tick", "tick", "stop"]:
+        machine.process(Event(name))
+    machine.dispatch(Event("start"))
+    machine.run_until_idle()
+
+    data = metrics.as_dict()
+    assert data["Running"]["tick"]["count"] == 2
+    assert data["Idle"]["start"]["count"] == 2
+    assert sum(data["Running"]["tick"]["buckets"]) == 2
+
+    text = metrics.to_prometheus()
+    assert 'ministate_events_total{state="Running",event="tick"} 2' in text
+    assert '_count{state="Running",event="tick"} 2' in text
+    assert '_bucket{state="Idle",event="start",le="+Inf"} 2' in text
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_sampled_metrics(compiled):
+    machine = StateMachine(
+        states=[Idle(), Running()],
+        transitions={"Idle": {"start": "Running"}, "Running": {"stop": "Idle"}},
+        compiled=compiled,
+    )
+    machine.current_state = machine.Idle
+    metrics = machine.enable_metrics(TransitionMetrics(sample_every=4))
+    machine.add_hook("on_transition", lambda s, e, t: None)
+    for _ in range(6):
+        machine.process(Event("start"))
+        machine.process(Event("tick"))
+        machine.process(Event("stop"))
+    # a state added later gets a counter row as well
+    machine.add_state(Paused())
+    machine.current_state = machine.Paused
+    machine.process(Event("tick"))
+
+    data = metrics.as_dict()
+    assert data["Running"]["tick"]["count"] == 6
+    assert data["Running"]["tick"]["timed"] == 1
+    assert data["Idle"]["start"]["count"] == 6
+    assert data["Paused"]["tick"]["count"] == 1
+    assert machine.current_state is machine.Paused
+
+    metrics.clear()
+    assert metrics.as_dict() == {}
+    with pytest.raises(ValueError):
+        TransitionMetrics(sample_every=3)
+
+
+def test_histogram_buckets():
+    event_id = Event("e").id
+    metrics = TransitionMetrics()
+    metrics.bind(["A"])[0][event_id] = 3
+    metrics.record(0, event_id, 10)
+    metrics.record(0, event_id, 100)
+    metrics.record(0, event_id, 10**12)
+
+    buckets = metrics.as_dict()["A"]["e"]["buckets"]
+    assert buckets[0] == 1
+    assert buckets[1] == 1
+    assert buckets[-1] == 1
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_metrics_keep_process_override(compiled):
+    class Logged(StateMachine):
+        def __init__(self):
+            super().__init__(states=[Idle(), Running()], compiled=compiled)
+            self.current_state = self.Idle
+            self.log = []
+
+        def process(self, event: Event):
+            self.log.append(event.name)
+            super().process(event)
+
+    machine = Logged()
+    metrics = machine.enable_metrics()
+    for _ in range(5):
+        machine.process(Event("start"))
+        machine.process(Event("stop"))
+
+    assert len(machine.log) == 10
+    assert machine.current_state is machine.Idle
+    assert metrics.as_dict()["Idle"]["start"]["count"] == 5
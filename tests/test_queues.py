@@ -0,0 +1,160 @@
+import queue
+import threading
+
+import pytest
+
+from ministate.queues import Coalesce, EventQueue, Overflow, Priority
+from ministate.statemachine import State, StateMachine, Event
+
+
+class Recorder(State):
+    def process(self, event: Event):
+        self.model.seen.append(event.name)
+        if event.name == "ping":
+            self.model.dispatch(Event("pong"), Priority.HIGH)
+        return self
+
+
+def make_machine(**kwargs):
+    recorder = Recorder()
+    machine = StateMachine(states=[recorder], current_state=recorder, **kwargs)
+    machine.seen = []
+    return machine
+
+
+def test_priorities():
+    machine = make_machine()
+    machine.dispatch_many([Event("a"), Event("ping"), Event("b")])
+    machine.dispatch(Event("urgent"), Priority.HIGH)
+
+    assert machine.run_until_idle() == 5
+    assert machine.seen == ["urgent", "a", "ping", "pong", "b"]
+    assert machine.run_until_idle() == 0
+
+
+def test_drop_policies():
+    newest = EventQueue(maxsize=2)
+    assert newest.put_many([Event("a"), Event("b"), Event("c")]) == 2
+    assert [newest.pop().name, newest.pop().name] == ["a", "b"]
+    assert newest.dropped == 1
+
+    oldest = EventQueue(maxsize=2, overflow=Overflow.DROP_OLDEST)
+    oldest.put_many([Event("a"), Event("b"), Event("c")])
+    assert [oldest.pop().name, oldest.pop().name] == ["b", "c"]
+    assert oldest.pop() is None
+
+    machine = make_machine(event_queue=EventQueue(levels=3, maxsize=1))
+    assert machine.dispatch(Event("a"), 2)
+    assert not machine.dispatch(Event("b"))
+
+
+def test_block_policy():
+    events = EventQueue(maxsize=1, overflow=Overflow.BLOCK, timeout=0.01)
+    events.put(Event("a"))
+    with pytest.raises(queue.Full):
+        events.put(Event("b"))
+
+    events.timeout = 5
+    producer = threading.Thread(target=events.put, args=(Event("c"),))
+    producer.start()
+    assert events.pop().name == "a"
+    producer.join()
+    assert events.pop().name == "c"
+
+
+def test_drain_three_levels():
+    events = EventQueue(levels=3)
+    seen = []
+
+    def process(event):
+        seen.append(event.name)
+        if event.name == "low":
+            events.put(Event("top"), 2)
+
+    events.put_many([Event("low"), Event("low2")], 0)
+    events.put(Event("mid"), 1)
+    assert events.drain(process) == 4
+    assert seen == ["mid", "low", "top", "low2"]
+    assert len(events) == 0
+
+
+def test_coalescing_keeps_order():
+    events = EventQueue(
+        coalesce={
+            "reading": Coalesce.KEEP_LATEST,
+            "connect": Coalesce.KEEP_FIRST,
+            "counts": (Coalesce.MERGE_CARGO, lambda old, new: old + new),
+        }
+    )
+    for i in range(100):
+        events.put(Event("reading", i))
+        events.put(Event("connect", i))
+        events.put(Event("counts", 1))
+        if i in (10, 50):
+            events.put(Event("marker", i))
+    events.put(Event("after"), Priority.HIGH)
+
+    seen = []
+    assert events.drain(lambda event: seen.append((event.name, event.cargo))) == 6
+    assert seen == [
+        ("after", None),
+        ("reading", 99),
+        ("connect", 0),
+        ("counts", 100),
+        ("marker", 10),
+        ("marker", 50),
+    ]
+    assert events.coalesced == 297
+
+    # once processed, the next event of the name is queued again
+    events.put(Event("reading", 1))
+    assert events.pop().cargo == 1
+    assert events.pop() is None
+
+
+def test_debounce():
+    now = [0.0]
+    events = EventQueue(coalesce={"burst": (Coalesce.DEBOUNCE, 1.0)}, clock=lambda: now[0])
+    for i in range(5):
+        now[0] = i * 0.5
+        events.put(Event("burst", i))
+    events.put(Event("other"))
+    assert len(events) == 2
+
+    seen = []
+    assert events.drain(lambda event: seen.append(event.cargo)) == 1
+    now[0] = 3.0
+    assert events.drain(lambda event: seen.append(event.cargo)) == 1
+    assert seen == [None, 4]
+    assert events.coalesced == 4
+
+
+def test_drop_oldest_debounced():
+    now = [0.0]
+    spec = (Coalesce.DEBOUNCE, 1.0)
+    events = EventQueue(
+        maxsize=2, overflow=Overflow.DROP_OLDEST, coalesce={"a": spec, "b": spec}, clock=lambda: now[0]
+    )
+    events.put(Event("a"))
+    now[0] = 0.5
+    events.put(Event("b"))
+    assert events.put(Event("other"))
+    assert len(events) == 2
+    assert events.dropped == 1
+
+    now[0] = 2.0
+    seen = []
+    events.drain(lambda event: seen.append(event.name))
+    assert seen == ["other", "b"]
+
+
+def test_coalescing_in_machine():
+    machine = make_machine(event_queue=EventQueue(coalesce={"tick": Coalesce.KEEP_FIRST}))
+    machine.dispatch_many([Event("tick")] * 1000 + [Event("ping")])
+    assert machine.run_until_idle() == 3
+    assert machine.seen == ["tick", "ping", "pong"]
+
+
+def test_coalesce_needs_argument():
+    with pytest.raises(ValueError):
+        EventQueue(coalesce={"x": Coalesce.MERGE_CARGO})
@@ -0,0 +1,89 @@
+import pytest
+
+from ministate.definition import NO_STATE, MachineDefinition
+from ministate.regions import OrthogonalMachine
+from ministate.statemachine import State, Event
+
+
+def make_region(names, transitions):
+    states = [type(name, (State,), {})() for name in names]
+    return MachineDefinition(states, transitions)
+
+
+class Quiet(State):
+    pass
+
+
+class Ringing(State):
+    def process(self, event: Event):
+        self.model.rings += 1
+        return self.model.alarm.states[0] if event.name == "silence" else self
+
+
+def make_device():
+    quiet, ringing = Quiet(), Ringing()
+    alarm = MachineDefinition([quiet, ringing], {"Quiet": {"trigger": ringing}})
+    regions = {
+        "connectivity": make_region(
+            ["Offline", "Online"], {"Offline": {"connect": "Online"}, "Online": {"drop": "Offline"}}
+        ),
+        "power": make_region(["Off", "On"], {"Off": {"power_on": "On"}, "On": {"power_off": "Off"}}),
+        "alarm": alarm,
+    }
+    device = OrthogonalMachine(regions, initial={"connectivity": "Offline", "power": "Off", "alarm": "Quiet"})
+    device.rings = 0
+    device.alarm = alarm
+    return device
+
+
+def test_routing():
+    device = make_device()
+    assert device.routes(Event("connect")) == ["connectivity", "alarm"]
+    assert device.routes(Event("power_off")) == ["power", "alarm"]
+    assert device.routes(Event("regions_never_seen")) == ["alarm"]
+
+
+def test_composite_state():
+    device = make_device()
+    assert device.state == (0, 0, 0)
+    device.process(Event("connect"))
+    device.process(Event("power_on"))
+    assert device.state == (1, 1, 0)
+    device.process(Event("trigger"))
+    device.process(Event("drop"))
+    assert device.state == (0, 1, 1)
+    assert device.rings == 1
+    device.process(Event("silence"))
+    assert device.state == (0, 1, 0)
+    assert {name: state.name for name, state in device.current_states.items()} == {
+        "connectivity": "Offline",
+        "power": "On",
+        "alarm": "Quiet",
+    }
+
+    # the composite state is a plain tuple, to restore or compare
+    device.state = (1, 0, 0)
+    assert device.current_states["connectivity"].name == "Online"
+
+
+def test_lazy_regions_rejected():
+    with pytest.raises(ValueError):
+        OrthogonalMachine({"lazy": MachineDefinition([Quiet], {})})
+
+
+def test_region_returns_name_or_none():
+    class Blinking(State):
+        def process(self, event: Event):
+            return None if event.name == "unplug" else "Steady"
+
+    led = MachineDefinition([Blinking(), type("Steady", (State,), {})()], {"Steady": {"blink": "Blinking"}})
+    power = make_region(["Off", "On"], {"Off": {"power_on": "On"}})
+    device = OrthogonalMachine({"led": led, "power": power}, initial={"led": "Blinking", "power": "Off"})
+
+    device.process(Event("ack"))
+    assert device.state == (1, 0)
+    device.process(Event("blink"))
+    device.process(Event("unplug"))
+    assert device.current_states["led"] is None
+    device.process(Event("power_on"))
+    assert device.state == (NO_STATE, 1)
@@ -0,0 +1,97 @@
+from ministate.definition import MachineDefinition
+from ministate.registry import MachineRegistry
+from ministate.statemachine import State, Event
+
+
+class Idle(State):
+    pass
+
+
+class Active(State):
+    pass
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_definition():
+    idle, active = Idle(), Active()
+    return MachineDefinition([idle, active], {"Idle": {"login": active}, "Active": {"logout": idle}})
+
+
+def test_lru_eviction_and_reload():
+    registry = MachineRegistry(make_definition(), initial_state="Idle", capacity=2, batch_size=1)
+    registry.dispatch("alice", Event("login"))
+    registry.dispatch("bob", Event("noop"))
+    registry.dispatch("alice", Event("noop"))
+    registry.dispatch(7, Event("login"))
+
+    assert registry.keys() == ["alice", 7]
+    assert registry.evicted == 1
+    assert dict(registry.spilled()) == {"bob": "Idle"}
+
+    registry.dispatch("bob", Event("login"))
+    assert registry.keys() == [7, "bob"]
+    assert registry.get("bob").current_state.name == "Active"
+    assert registry.get("alice").current_state.name == "Active"
+    assert dict(registry.spilled()) == {7: "Active"}
+
+
+def test_ttl_eviction():
+    clock = Clock()
+    registry = MachineRegistry(make_definition(), initial_state="Idle", ttl=10, clock=clock)
+    for key in range(5):
+        clock.now = key
+        registry.dispatch(key, Event("login"))
+
+    clock.now = 12.5
+    assert registry.evict_idle() == 3
+    assert registry.keys() == [3, 4]
+    registry.dispatch(0, Event("logout"))
+    assert registry.get(0).current_state.name == "Idle"
+    assert 0 in registry and 1 not in registry
+
+
+def test_persists_across_registries(tmp_path):
+    path = str(tmp_path / "machines.sqlite")
+    models = []
+
+    def model_factory(key):
+        models.append(key)
+        return {"key": key}
+
+    with MachineRegistry(make_definition(), path, "Idle", model_factory=model_factory) as registry:
+        registry.dispatch("carol", Event("login"))
+        registry.dispatch("dave", Event("noop"))
+
+    registry = MachineRegistry(make_definition(), path, "Idle", model_factory=model_factory)
+    assert len(registry) == 0
+    assert registry.get("carol").current_state.name == "Active"
+    assert registry.get("carol").model == {"key": "carol"}
+    assert registry.get("erin").current_state.name == "Idle"
+    assert models == ["carol", "dave", "carol", "erin"]
+    registry.close()
+
+
+def test_evicts_lazy_machines_without_creating_states():
+    created = []
+
+    class Lazy(State):
+        def __init__(self):
+            super().__init__()
+            created.append(self.name)
+
+    definition = MachineDefinition([Lazy, Active], {"Lazy": {"login": "Active"}})
+    registry = MachineRegistry(definition, initial_state="Lazy", capacity=1)
+    registry.dispatch("alice", Event("login"))
+    registry.get("bob")
+    registry.get("carol").current_state = None
+    registry.get("dave")
+
+    assert created == []
+    assert dict(registry.spilled()) == {"alice": "Active", "bob": "Lazy", "carol": None}
@@ -0,0 +1,76 @@
+import multiprocessing
+
+import pytest
+
+from ministate.sharded import ShardError, ShardedRuntime
+from ministate.statemachine import State, StateMachine, Event
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="test factory is defined in a test module"
+)
+
+
+class Off(State):
+    def process(self, event: Event):
+        return self.model.On if event.name == "toggle" else self
+
+
+class On(State):
+    def process(self, event: Event):
+        return self.model.Off if event.name == "toggle" else self
+
+
+class Broken(State):
+    def process(self, event: Event):
+        if event.name == "boom":
+            raise ValueError("bad event")
+        return self
+
+
+def make_switch(key):
+    machine = StateMachine(states=[Off(), On()])
+    machine.current_state = machine.Off
+    return machine
+
+
+def make_broken(key):
+    machine = StateMachine(states=[Broken()])
+    machine.current_state = machine.Broken
+    return machine
+
+
+def test_dispatch_and_snapshot():
+    with ShardedRuntime(make_switch, shards=2, batch_size=3, context="fork") as runtime:
+        for key in range(10):
+            for _ in range(key):
+                runtime.dispatch(key, Event("toggle"))
+        states = runtime.snapshot()
+        assert states == {key: "On" if key % 2 else "Off" for key in range(1, 10)}
+
+        runtime.dispatch(1, Event("toggle"))
+    assert runtime.states[1] == "Off"
+
+
+def test_periodic_snapshots():
+    runtime = ShardedRuntime(make_switch, shards=1, batch_size=1, snapshot_every=1, context="fork")
+    runtime.dispatch("a", Event("toggle"))
+    runtime.close()
+    assert runtime.states == {"a": "On"}
+
+
+def test_worker_failure():
+    runtime = ShardedRuntime(make_broken, shards=2, context="fork", poll_interval=0.01)
+    runtime.dispatch(0, Event("ok"))
+    runtime.dispatch(1, Event("boom"))
+    with pytest.raises(ShardError, match="bad event"):
+        runtime.snapshot()
+    processes = list(runtime._processes)
+    runtime.close()
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_exit_after_failure():
+    with pytest.raises(ShardError):
+        with ShardedRuntime(make_broken, shards=1, batch_size=1, context="fork") as runtime:
+            runtime.dispatch("a", Event("boom"))
+            runtime.snapshot()
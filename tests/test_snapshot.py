@@ -0,0 +1,69 @@
+from ministate.snapshot import (
+    NO_STATE,
+    dump_state,
+    export_states,
+    import_states,
+    load_state,
+    load_states,
+    save_states,
+)
+from ministate.definition import MachineDefinition
+from ministate.statemachine import State, StateMachine, Event
+
+
+class Idle(State):
+    def process(self, event: Event):
+        return self
+
+
+class Busy(State):
+    def process(self, event: Event):
+        return self
+
+
+def make_machine(state=None):
+    machine = StateMachine(states=[Idle(), Busy()])
+    machine.current_state = getattr(machine, state) if state else None
+    return machine
+
+
+def test_single_machine():
+    snapshot = dump_state(make_machine("Busy"), b"extra")
+    assert len(snapshot) == 2 + len(b"extra")
+
+    restored = make_machine()
+    assert load_state(restored, snapshot) == b"extra"
+    assert restored.current_state is restored.Busy
+
+    load_state(restored, dump_state(make_machine()))
+    assert restored.current_state is None
+
+
+def test_bulk(tmp_path):
+    machines = [make_machine(name) for name in ["Idle", "Busy", None, "Busy"]]
+    states = export_states(machines)
+    assert list(states) == [0, 1, NO_STATE, 1]
+
+    restored = [make_machine() for _ in machines]
+    import_states(restored, states)
+    assert [m.current_state and m.current_state.name for m in restored] == ["Idle", "Busy", None, "Busy"]
+
+    path = str(tmp_path / "states.bin")
+    save_states(path, machines)
+    restored = [make_machine("Idle") for _ in machines]
+    load_states(path, restored)
+    assert [m.current_state and m.current_state.name for m in restored] == ["Idle", "Busy", None, "Busy"]
+
+
+def test_lazy_machine():
+    definition = MachineDefinition([Idle, Busy], {"Idle": {"go": "Busy"}})
+    machine = definition.create(state="Idle")
+    machine.process(Event("go"))
+    # creates the state object of the machine
+    assert machine.current_state.name == "Busy"
+
+    restored = definition.create()
+    load_state(restored, dump_state(machine))
+    assert restored.state_id == machine.state_id
+    assert restored._states == {}
+    assert export_states([machine, definition.create()]).tolist() == [1, NO_STATE]
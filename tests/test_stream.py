@@ -0,0 +1,53 @@
+from ministate.statemachine import State, StateMachine, Event
+
+
+class Idle(State):
+    def process(self, event: Event):
+        return self.model.Running if event.name == "start" else self
+
+
+class Running(State):
+    def process(self, event: Event):
+        return self.model.Idle if event.name == "relax" else self
+
+
+def make_machine():
+    machine = StateMachine(states=[Idle(), Running()])
+    machine.current_state = machine.Idle
+    return machine
+
+
+def test_feed_yields_transitions():
+    machine = make_machine()
+    events = map(Event, "relax,start,start,relax".split(","))
+    transitions = [(source.name, event.name, target.name) for source, event, target in machine.feed(events)]
+    assert transitions == [
+        ("Idle", "relax", "Idle"),
+        ("Idle", "start", "Running"),
+        ("Running", "start", "Running"),
+        ("Running", "relax", "Idle"),
+    ]
+
+
+def test_feed_is_lazy():
+    machine = make_machine()
+    consumed = []
+
+    def events():
+        for i in range(1000):
+            consumed.append(i)
+            yield Event("start" if i % 2 else "relax")
+
+    stream = machine.feed(events(), chunk_size=10, skip_self=True)
+    source, event, target = next(stream)
+    assert (source, event.name, target) == (machine.Idle, "start", machine.Running)
+    assert len(consumed) == 10
+    assert sum(1 for _ in stream) == 998
+    assert len(consumed) == 1000
+
+
+def test_run_stream():
+    machine = make_machine()
+    assert machine.run_stream(Event("start") for _ in range(5)) == 5
+    assert machine.current_state is machine.Running
+    assert machine.run_stream([]) == 0
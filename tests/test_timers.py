@@ -0,0 +1,189 @@
+import asyncio
+import random
+import threading
+import time
+
+import pytest
+
+from ministate.actor import MachineActor
+from ministate.statemachine import State, StateMachine, Event
+from ministate.timers import AsyncTimingWheel, StateTimeouts, TimingWheel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_wheel_fires_in_order():
+    clock = Clock()
+    wheel = TimingWheel(resolution=1, size=4, levels=2, clock=clock)
+    fired = []
+    delays = list(range(1, 40))
+    random.Random(1).shuffle(delays)
+    timers = {
+        delay: wheel.schedule(delay, lambda delay=delay: fired.append((delay, clock.now))) for delay in delays
+    }
+    wheel.cancel(timers[5])
+    wheel.cancel(timers[5])
+    assert len(wheel) == len(delays) - 1
+
+    for now in range(1, 45):
+        clock.now = now
+        wheel.advance()
+
+    assert fired == [(delay, float(delay)) for delay in range(1, 40) if delay != 5]
+    assert not timers[7].active
+    assert len(wheel) == 0
+
+
+def test_wheel_skips_idle_time():
+    wheel = TimingWheel(resolution=0.5, size=8, levels=2, clock=lambda: 0.0)
+    assert wheel.advance(1e6) == 0
+    fired = []
+    wheel.schedule(2, lambda: fired.append(True))
+    assert wheel.advance(1e6 + 1.5) == 0
+    assert wheel.advance(1e6 + 2) == 1
+
+
+class Waiting(State):
+    timeout = 30
+
+    def process(self, event: Event):
+        if event.name == "timeout":
+            return self.model.Expired
+        return self.model.Active if event.name == "data" else self
+
+
+class Active(State):
+    def process(self, event: Event):
+        if event.name == "ping":
+            self.model.pings += 1
+        return self.model.Waiting if event.name == "idle" else self
+
+
+class Expired(State):
+    pass
+
+
+def make_machine():
+    machine = StateMachine(states=[Waiting(), Active(), Expired()])
+    machine.current_state = machine.Waiting
+    machine.pings = 0
+    return machine
+
+
+def test_state_timeouts():
+    clock = Clock()
+    wheel = TimingWheel(resolution=1, size=16, levels=3, clock=clock)
+    timeouts = StateTimeouts(wheel)
+    quiet, busy = make_machine(), make_machine()
+    timeouts.attach(quiet)
+    timeouts.attach(busy)
+
+    clock.now = 10
+    wheel.advance()
+    busy.process(Event("data"))
+    timeouts.schedule(busy, 5, Event("ping"))
+    assert len(wheel) == 2
+
+    clock.now = 31
+    wheel.advance()
+    assert quiet.current_state is quiet.Expired
+    assert busy.current_state is busy.Active
+    assert busy.pings == 1
+    assert timeouts.pending(busy) == 0
+
+    busy.process(Event("idle"))
+    timeouts.schedule(busy, 100, Event("ping"))
+    busy.process(Event("data"))
+    assert len(wheel) == 0
+
+    timeouts.detach(busy)
+    busy.process(Event("idle"))
+    assert len(wheel) == 0
+
+
+@pytest.mark.parametrize("restart, expires", [(True, 50), (False, 30)])
+def test_timeout_restart(restart, expires):
+    clock = Clock()
+    wheel = TimingWheel(resolution=1, size=16, levels=3, clock=clock)
+    timeouts = StateTimeouts(wheel, restart=restart)
+    machine = make_machine()
+    timeouts.attach(machine)
+
+    clock.now = 20
+    wheel.advance()
+    machine.process(Event("noise"))
+    assert timeouts.pending(machine) == 1
+
+    clock.now = expires - 1
+    wheel.advance()
+    assert machine.current_state is machine.Waiting
+    clock.now = expires
+    wheel.advance()
+    assert machine.current_state is machine.Expired
+    assert timeouts.pending(machine) == 0
+
+
+def test_cancel_while_firing():
+    clock = Clock()
+    wheel = TimingWheel(resolution=1, clock=clock)
+    fired = []
+    timers = [
+        wheel.schedule(1, lambda i=i: (fired.append(i), [wheel.cancel(t) for t in timers])) for i in range(3)
+    ]
+
+    clock.now = 1
+    assert wheel.advance() == 1
+    assert len(fired) == 1
+    assert len(wheel) == 0
+
+
+def test_threaded_driver():
+    wheel = TimingWheel(resolution=0.001)
+    stop = threading.Event()
+    driver = threading.Thread(target=wheel.run, args=(stop,), daemon=True)
+    driver.start()
+
+    # other threads schedule and cancel while the driver advances
+    def churn():
+        for _ in range(2000):
+            wheel.cancel(wheel.schedule(0.001, lambda: None))
+
+    threads = [threading.Thread(target=churn) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    machine = make_machine()
+    machine.Waiting.timeout = 0.005
+    actor = MachineActor(machine)
+    actor.start()
+    timeouts = StateTimeouts(wheel, deliver=lambda machine, event: actor.send(event))
+    timeouts.attach(machine)
+    deadline = time.monotonic() + 2
+    while machine.current_state is not machine.Expired and time.monotonic() < deadline:
+        time.sleep(0.001)
+    actor.stop()
+    stop.set()
+    driver.join()
+
+    assert machine.current_state is machine.Expired
+    assert len(wheel) == 0
+
+
+def test_async_wheel():
+    async def main():
+        wheel = AsyncTimingWheel(resolution=0.001)
+        fired = asyncio.Event()
+        wheel.schedule(0.005, fired.set)
+        runner = asyncio.create_task(wheel.run())
+        await asyncio.wait_for(fired.wait(), 2)
+        runner.cancel()
+
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+from ministate.statemachine import State, StateMachine, Event
+from ministate.trace import NO_STATE, TraceRecorder, replay
+
+
+class Idle(State):
+    def process(self, event: Event):
+        return self.model.Running if event.name == "start" else self
+
+
+class Running(State):
+    def process(self, event: Event):
+        if event.name == "stop":
+            return self.model.Idle
+        if event.name == "quit":
+            return None
+        # a bug that depends on hidden state
+        return self.model.Idle if getattr(self.model, "flaky", False) else self
+
+
+def make_machine():
+    machine = StateMachine(states=[Idle(), Running()])
+    machine.current_state = machine.Idle
+    return machine
+
+
+def test_ring_buffer():
+    machine = make_machine()
+    ticks = iter(range(100))
+    recorder = TraceRecorder(capacity=3, clock=lambda: next(ticks))
+    recorder.attach(machine)
+
+    for name in ["start", "tick", "stop", "start"]:
+        machine.process(Event(name))
+
+    assert len(recorder) == 3
+    assert recorder.records(names=True) == [(1.0, 1, "tick", 1), (2.0, 1, "stop", 0), (3.0, 0, "start", 1)]
+
+    recorder.detach()
+    machine.process(Event("stop"))
+    assert recorder.count == 4
+
+
+def test_replay():
+    machine = make_machine()
+    recorder = TraceRecorder()
+    recorder.attach(machine)
+    machine.flaky = True
+    for name in ["start", "tick", "start"]:
+        machine.process(Event(name))
+
+    trace = recorder.records()
+    assert replay(trace, make_machine()) == 1
+
+    flaky = make_machine()
+    flaky.flaky = True
+    assert replay(recorder.records(names=True), flaky) is None
+
+
+def test_stopped_machine():
+    machine = make_machine()
+    recorder = TraceRecorder()
+    recorder.attach(machine)
+    for name in ["start", "quit"]:
+        machine.process(Event(name))
+
+    assert machine.current_state is None
+    trace = recorder.records(names=True)
+    assert [target for _, _, _, target in trace] == [1, NO_STATE]
+    assert replay(trace, make_machine()) is None
+    assert replay(trace[:1] + [(0.0, 1, "tick", NO_STATE)], make_machine()) == 1
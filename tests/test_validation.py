@@ -0,0 +1,123 @@
+import pytest
+
+from ministate.statemachine import State, StateMachine, Event
+from ministate.table import Transition
+from ministate.validation import ValidationError, validate_transitions
+
+
+class Idle(State):
+    pass
+
+
+class Receiving(State):
+    def process(self, event: Event):
+        return self
+
+
+class Stopped(State):
+    pass
+
+
+class Orphan(State):
+    pass
+
+
+class Unregistered(State):
+    pass
+
+
+def make_states():
+    return [Idle(), Receiving(), Stopped()]
+
+
+def test_mismatched_state_key():
+    # the typo that used to live in test_messagereceiver.py
+    idle, receiving, stopped = make_states()
+    machine = StateMachine(states=[idle, receiving], current_state=idle)
+    machine.transitions = {"Idle": {"start_receiving": receiving}, "Processing": {"stop_processing": idle}}
+
+    with pytest.raises(ValidationError) as error:
+        machine.validate()
+    assert error.value.report.unknown_states == ["Processing"]
+
+    machine.transitions = {"Idle": {"start_receiving": receiving}, "Receiving": {"stop_processing": idle}}
+    assert machine.validate().ok
+
+
+def test_findings():
+    idle, receiving, stopped = make_states()
+    orphan = Orphan(parent=Unregistered())
+    transitions = {
+        "Idle": {"start": [Transition("Receiving", guard=lambda m, e: True), Transition("Lost")]},
+        "Receiving": {Event("stop"): stopped, "typo": idle},
+    }
+    report = validate_transitions(
+        [idle, receiving, stopped, orphan], transitions, initial=idle, events=["start", "stop"]
+    )
+
+    assert report.unknown_targets == [("Idle", "start", "Lost")]
+    assert report.unknown_events == [("Receiving", "typo")]
+    assert report.unknown_parents == [("Orphan", "Unregistered")]
+    assert report.unreachable == ["Orphan"]
+    # Receiving has its own process, so only the table-driven states count as dead ends
+    assert report.dead_ends == ["Stopped", "Orphan"]
+    assert not report.ok
+    assert "unreachable" in str(report)
+
+
+def test_inherited_exits():
+    parent = Stopped()
+    idle = Idle(parent=parent)
+    report = validate_transitions(
+        [parent, idle], {"Stopped": {"resume": idle, "halt": parent}}, initial=idle, events=[]
+    )
+    assert report.dead_ends == []
+    assert report.unreachable == []
+
+
+def test_prune():
+    idle, orphan, stopped = Idle(), Orphan(), Stopped()
+    transitions = {"Idle": {"start": orphan}, "Orphan": {"stop": idle}, "Stopped": {"start": idle}}
+    machine = StateMachine(states=[idle, orphan, stopped], transitions=transitions, current_state=idle)
+
+    table = machine.compile(prune=True)
+    assert table.reachable(0) == {0, 1}
+    assert table.lookup(2, "start") == -1
+    assert table.lookup(0, "start") == 1
+
+
+@pytest.mark.parametrize("metrics", [False, True])
+def test_pruned_table_only_for_dispatch(metrics):
+    idle, orphan, stopped = Idle(), Orphan(), Stopped()
+    transitions = {"Idle": {"start": orphan}, "Orphan": {"stop": idle}, "Stopped": {"resume": idle}}
+    machine = StateMachine(
+        states=[idle, orphan, stopped], transitions=transitions, current_state=idle, compiled=True
+    )
+    if metrics:
+        machine.enable_metrics()
+    machine.compile(prune=True)
+    assert machine.graph.shortest_path("Stopped", "Idle") == ["resume"]
+
+    machine.current_state = stopped
+    machine.process(Event("resume"))
+    assert machine.current_state is idle
+    assert not machine.graph.pruned
+
+
+def test_no_prune_with_process_override():
+    class Starting(State):
+        def process(self, event: Event):
+            return self.model.Receiving if event.name == "begin" else self
+
+    starting, receiving, stopped = Starting(), Receiving(), Stopped()
+    transitions = {"Receiving": {"stop": stopped}}
+    machine = StateMachine(
+        states=[starting, receiving, stopped], transitions=transitions, current_state=starting
+    )
+
+    table = machine.compile(prune=True)
+    assert table.lookup(1, "stop") == 2
+    machine.compiled = True
+    machine.process(Event("begin"))
+    machine.process(Event("stop"))
+    assert machine.current_state is stopped